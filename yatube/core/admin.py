@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'attempts', 'run_at', 'locked_by'
+    )
+    list_filter = ('status', 'name')
+    readonly_fields = ('created', 'locked_at', 'last_error')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        queryset.update(status=Task.QUEUED, attempts=0, locked_by='')
+    retry.short_description = 'Повторить выбранные задачи'
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,34 @@
+"""SQLite с настройками для нескольких процессов на одной машине.
+
+Поверх стандартного бэкенда два параметра в ``OPTIONS``:
+
+- ``pragmas`` — PRAGMA, которые выполняются на каждом новом соединении
+  (``journal_mode=WAL``, ``synchronous=NORMAL``, ``mmap_size``,
+  ``busy_timeout`` и т. п.);
+- ``transaction_mode`` — ``IMMEDIATE`` открывает транзакции
+  ``transaction.atomic`` сразу с блокировкой на запись. Иначе транзакция,
+  которая сначала читает, а потом пишет, при параллельной записи получает
+  ``database is locked`` без ожидания: busy timeout на повышение
+  блокировки не действует.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = kwargs.pop('pragmas', {})
+        self.transaction_mode = kwargs.pop('transaction_mode', '')
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,6 @@
+"""Общие для всех процессов бэкенды кеша.
+
+``SQLiteCache`` хранит записи в файле SQLite рядом с проектом и не требует
+отдельного сервера. ``RedisCache`` говорит по протоколу RESP с Redis или с
+встроенной заменой из ``core.cache.server`` (команда ``cache_server``).
+"""
@@ -0,0 +1,31 @@
+import threading
+
+
+class CacheStats:
+    """Счётчики попаданий и промахов кеша в текущем процессе."""
+    FIELDS = ('hits', 'misses', 'sets', 'deletes', 'evictions')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.values = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.values[name] += delta
+
+    def take(self):
+        """Возвращает накопленные значения и обнуляет их."""
+        with self._lock:
+            values = self.values
+            self.values = dict.fromkeys(self.FIELDS, 0)
+        return values
+
+
+def hit_ratio(stats):
+    total = stats['hits'] + stats['misses']
+    return stats['hits'] / total if total else None
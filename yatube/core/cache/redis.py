@@ -0,0 +1,150 @@
+import pickle
+import time
+from urllib.parse import urlsplit
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .resp import Client
+
+
+def dumps(value):
+    # Целые храним текстом, чтобы INCRBY работал на стороне сервера.
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value).encode()
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data):
+    try:
+        return int(data)
+    except ValueError:
+        return pickle.loads(data)
+
+
+class RedisCache(BaseCache):
+    """Кеш в Redis или совместимом сервере (``redis://host:port/db``).
+
+    Вытеснение настраивается на сервере (``maxmemory-policy`` у Redis,
+    ``--eviction`` у ``cache_server``). ``clear()`` очищает всю базу
+    сервера, поэтому кешу стоит выделить отдельный номер базы.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        url = urlsplit(location)
+        self.client = Client(
+            url.hostname or '127.0.0.1',
+            url.port or 6379,
+            timeout=options.get('SOCKET_TIMEOUT', 1),
+            db=int(url.path.strip('/') or 0),
+            password=url.password,
+        )
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expiry(self, timeout):
+        """Аргументы SET для срока жизни; None — запись уже просрочена."""
+        expires = self.get_backend_timeout(timeout)
+        if expires is None:
+            return ()
+        milliseconds = int((expires - time.time()) * 1000)
+        if milliseconds <= 0:
+            return None
+        return ('PX', milliseconds)
+
+    def get(self, key, default=None, version=None):
+        data = self.client.execute('GET', self._key(key, version))
+        return default if data is None else loads(data)
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        if not made:
+            return {}
+        values = self.client.execute('MGET', *made)
+        return {
+            made[key]: loads(data)
+            for key, data in zip(made, values) if data is not None
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            self.client.execute('DEL', key)
+            return
+        self.client.execute('SET', key, dumps(value), *expiry)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expiry = self._expiry(timeout)
+        keys = [self._key(key, version) for key in data]
+        if expiry is None:
+            self.delete_many(data, version=version)
+            return []
+        self.client.pipeline(*(
+            ('SET', key, dumps(value), *expiry)
+            for key, value in zip(keys, data.values())
+        ))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return not self.client.execute('EXISTS', key)
+        return self.client.execute(
+            'SET', key, dumps(value), *expiry, 'NX'
+        ) is not None
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry == ():
+            return bool(self.client.execute('PERSIST', key)) or (
+                self.has_key(key)
+            )
+        if expiry is None:
+            return bool(self.client.execute('DEL', key))
+        return bool(self.client.execute('PEXPIRE', key, expiry[1]))
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self.client.execute('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        return bool(self.client.execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        # Между EXISTS и INCRBY запись может вытесниться — тогда INCRBY
+        # создаст её заново со значением delta, как и при гонке set().
+        if not self.client.execute('EXISTS', key):
+            raise ValueError(f"Key '{key}' not found")
+        return self.client.execute('INCRBY', key, delta)
+
+    def clear(self):
+        self.client.execute('FLUSHDB')
+
+    def stats(self):
+        """Счётчики сервера (общие для всех процессов)."""
+        info = self.client.execute('INFO', 'stats').decode()
+        values = dict(
+            line.split(':', 1) for line in info.splitlines()
+            if ':' in line
+        )
+        return {
+            'hits': int(values.get('keyspace_hits', 0)),
+            'misses': int(values.get('keyspace_misses', 0)),
+            'evictions': int(values.get('evicted_keys', 0)),
+            'entries': self.client.execute('DBSIZE'),
+        }
+
+    def close(self, **kwargs):
+        pass
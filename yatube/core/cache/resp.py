@@ -0,0 +1,105 @@
+"""Минимальный клиент протокола RESP2 (Redis) без внешних зависимостей."""
+import socket
+import threading
+
+
+class RESPError(Exception):
+    """Ошибка, которую вернул сервер."""
+
+
+def encode(*args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError('Сервер закрыл соединение')
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body.decode()
+    if kind == b'-':
+        return RESPError(body.decode())
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        length = int(body)
+        if length < 0:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise ConnectionError(f'Непонятный ответ сервера: {line!r}')
+
+
+class Connection:
+    def __init__(self, host, port, timeout=None, db=0, password=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    def pipeline(self, *commands):
+        """Отправляет команды одним пакетом и читает все ответы."""
+        self.sock.sendall(b''.join(encode(*command) for command in commands))
+        replies = [read_reply(self.stream) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RESPError):
+                raise reply
+        return replies
+
+    def execute(self, *command):
+        return self.pipeline(command)[0]
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+class Client:
+    """Клиент с отдельным соединением на каждый поток."""
+
+    def __init__(self, host='127.0.0.1', port=6379, **options):
+        self.host = host
+        self.port = port
+        self.options = options
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = Connection(self.host, self.port, **self.options)
+            self._local.connection = connection
+        return connection
+
+    def reset(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            connection.close()
+
+    def pipeline(self, *commands):
+        try:
+            return self.connection.pipeline(*commands)
+        except (ConnectionError, OSError):
+            # Сервер мог перезапуститься: одна попытка на новом соединении.
+            self.reset()
+            return self.connection.pipeline(*commands)
+
+    def execute(self, *command):
+        return self.pipeline(command)[0]
@@ -0,0 +1,206 @@
+"""Встроенная замена Redis для разработки и тестов.
+
+Понимает подмножество команд, которым пользуется ``RedisCache``, хранит
+данные в памяти процесса и умеет вытеснять записи при превышении
+``max_entries``. Запускается командой ``manage.py cache_server``.
+"""
+import random
+import socketserver
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from .resp import RESPError, read_reply
+
+EVICTION_POLICIES = ('allkeys-lru', 'allkeys-random', 'noeviction')
+
+
+class Store:
+    def __init__(self, max_entries=0, eviction='allkeys-lru'):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f'Неизвестная политика вытеснения {eviction}')
+        self.max_entries = max_entries
+        self.eviction = eviction
+        self.dbs = defaultdict(OrderedDict)
+        self.lock = threading.Lock()
+        self.stats = defaultdict(int)
+
+    def _now(self):
+        return time.time() * 1000
+
+    def _get(self, db, key):
+        entry = db.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= self._now():
+            del db[key]
+            self.stats['expired_keys'] += 1
+            return None
+        if self.eviction == 'allkeys-lru':
+            db.move_to_end(key)
+        return entry
+
+    def _make_room(self, db, key):
+        if not self.max_entries or key in db:
+            return
+        while len(db) >= self.max_entries:
+            if self.eviction == 'noeviction':
+                raise RESPError(
+                    'OOM command not allowed when used memory > maxmemory'
+                )
+            if self.eviction == 'allkeys-random':
+                del db[random.choice(list(db))]
+            else:
+                db.popitem(last=False)
+            self.stats['evicted_keys'] += 1
+
+    def execute(self, index, name, args):
+        handler = getattr(self, f'cmd_{name.lower()}', None)
+        if handler is None:
+            return RESPError(f"ERR unknown command '{name}'")
+        with self.lock:
+            try:
+                return handler(self.dbs[index], *args)
+            except RESPError as error:
+                return error
+            except (TypeError, ValueError):
+                return RESPError(
+                    f"ERR wrong arguments for '{name.lower()}' command"
+                )
+
+    def cmd_ping(self, db, *args):
+        return args[0] if args else 'PONG'
+
+    def cmd_get(self, db, key):
+        entry = self._get(db, key)
+        self.stats['keyspace_hits' if entry else 'keyspace_misses'] += 1
+        return entry and entry[0]
+
+    def cmd_mget(self, db, *keys):
+        return [self.cmd_get(db, key) for key in keys]
+
+    def cmd_set(self, db, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        for unit, scale in ((b'EX', 1000), (b'PX', 1)):
+            if unit in options:
+                ttl = int(options[options.index(unit) + 1]) * scale
+                expires = self._now() + ttl
+        exists = self._get(db, key) is not None
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        self._make_room(db, key)
+        db[key] = (value, expires)
+        db.move_to_end(key)
+        return 'OK'
+
+    def cmd_del(self, db, *keys):
+        deleted = 0
+        for key in keys:
+            if self._get(db, key) is not None:
+                del db[key]
+                deleted += 1
+        return deleted
+
+    def cmd_exists(self, db, *keys):
+        return sum(self._get(db, key) is not None for key in keys)
+
+    def cmd_incrby(self, db, key, delta):
+        entry = self._get(db, key)
+        value, expires = entry or (b'0', None)
+        try:
+            value = int(value) + int(delta)
+        except ValueError:
+            raise RESPError('ERR value is not an integer or out of range')
+        self._make_room(db, key)
+        db[key] = (str(value).encode(), expires)
+        return value
+
+    def cmd_incr(self, db, key):
+        return self.cmd_incrby(db, key, 1)
+
+    def cmd_pexpire(self, db, key, milliseconds):
+        entry = self._get(db, key)
+        if entry is None:
+            return 0
+        db[key] = (entry[0], self._now() + int(milliseconds))
+        return 1
+
+    def cmd_persist(self, db, key):
+        entry = self._get(db, key)
+        if entry is None or entry[1] is None:
+            return 0
+        db[key] = (entry[0], None)
+        return 1
+
+    def cmd_dbsize(self, db):
+        return len(db)
+
+    def cmd_flushdb(self, db):
+        db.clear()
+        return 'OK'
+
+    def cmd_info(self, db, *sections):
+        lines = ['# Stats'] + [
+            f'{name}:{self.stats[name]}' for name in (
+                'keyspace_hits', 'keyspace_misses',
+                'evicted_keys', 'expired_keys',
+            )
+        ]
+        return '\r\n'.join(lines).encode()
+
+
+def encode_reply(reply):
+    if isinstance(reply, RESPError):
+        return b'-%s\r\n' % str(reply).encode()
+    if isinstance(reply, str):
+        return b'+%s\r\n' % reply.encode()
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(map(encode_reply, reply))
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        index = 0
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError, ValueError):
+                return
+            if not isinstance(command, list) or not command:
+                return
+            name, args = command[0].decode(), command[1:]
+            upper = name.upper()
+            if upper == 'QUIT':
+                self.wfile.write(encode_reply('OK'))
+                return
+            if upper == 'SELECT':
+                index = int(args[0])
+                reply = 'OK'
+            elif upper == 'AUTH':
+                reply = 'OK'
+            else:
+                reply = self.server.store.execute(index, name, args)
+            self.wfile.write(encode_reply(reply))
+
+
+class Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, store):
+        super().__init__(address, Handler)
+        self.store = store
+
+
+def serve_in_thread(host='127.0.0.1', port=0, **options):
+    """Запускает сервер в фоновом потоке; порт 0 — любой свободный."""
+    server = Server((host, port), Store(**options))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
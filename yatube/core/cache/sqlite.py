@@ -0,0 +1,267 @@
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .base import CacheStats
+
+EVICTION_COLUMNS = {
+    'lru': 'accessed',
+    'fifo': 'created',
+    'ttl': 'expires',
+}
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite, общий для всех процессов на одной машине.
+
+    Параметры ``OPTIONS``: ``MAX_ENTRIES`` и ``CULL_FREQUENCY`` как у
+    встроенных бэкендов, ``EVICTION`` — какие записи вытесняются первыми
+    (``lru``, ``fifo`` или ``ttl``), ``CULL_INTERVAL`` — через сколько
+    записей процесс проверяет размер, ``LRU_RESOLUTION`` — насколько редко
+    (в секундах) обновляется время последнего чтения записи.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.eviction = options.get('EVICTION', 'lru')
+        if self.eviction not in EVICTION_COLUMNS:
+            raise ValueError(
+                f'Неизвестная политика вытеснения {self.eviction}'
+            )
+        self.cull_interval = int(options.get('CULL_INTERVAL', 100))
+        self.lru_resolution = float(options.get('LRU_RESOLUTION', 1))
+        self.stats_interval = float(options.get('STATS_INTERVAL', 5))
+        self._local = threading.local()
+        self._stats = CacheStats()
+        self._writes = 0
+        self._stats_flushed = time.time()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None,
+                check_same_thread=False
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(f'''
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires REAL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS cache_{self.eviction}
+                    ON cache ({EVICTION_COLUMNS[self.eviction]});
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+            ''')
+            self._local.db = db
+        return db
+
+    def _fetch(self, keys):
+        now = time.time()
+        found, stale = {}, []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._db.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk
+            ).fetchall()
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = pickle.loads(value)
+                if now - accessed >= self.lru_resolution:
+                    stale.append(key)
+        if stale and self.eviction == 'lru':
+            self._db.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                [(now, key) for key in stale]
+            )
+        self._count(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def _count(self, **deltas):
+        self._stats.add(**deltas)
+        if time.time() - self._stats_flushed >= self.stats_interval:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        self._stats_flushed = time.time()
+        values = [
+            (name, value) for name, value in self._stats.take().items()
+            if value
+        ]
+        self._db.executemany(
+            'INSERT INTO cache_stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT (name) DO UPDATE SET value = value + excluded.value',
+            values
+        )
+
+    def stats(self):
+        """Счётчики всех процессов, работающих с этим файлом."""
+        self._flush_stats()
+        values = dict.fromkeys(CacheStats.FIELDS, 0)
+        values.update(self._db.execute(
+            'SELECT name, value FROM cache_stats'
+        ).fetchall())
+        values['entries'] = self._db.execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()[0]
+        return values
+
+    def _store(self, items, timeout, mode='REPLACE'):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        if mode == 'ADD':
+            # Просроченная запись не мешает add().
+            self._db.executemany(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                [(key, now) for key, value in items]
+            )
+            mode = 'IGNORE'
+        cursor = self._db.executemany(
+            f'INSERT OR {mode} INTO cache '
+            '(key, value, expires, created, accessed) '
+            'VALUES (?, ?, ?, ?, ?)',
+            [
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                 expires, now, now)
+                for key, value in items
+            ]
+        )
+        self._count(sets=cursor.rowcount)
+        self._writes += len(items)
+        if self._writes >= self.cull_interval:
+            self._writes = 0
+            self._cull()
+        return cursor.rowcount
+
+    def _cull(self):
+        now = time.time()
+        self._db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        count = self._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            culled = count
+            self._db.execute('DELETE FROM cache')
+        else:
+            culled = count // self._cull_frequency
+            column = EVICTION_COLUMNS[self.eviction]
+            # Для ttl бессрочные записи (expires IS NULL) идут последними.
+            self._db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                f'ORDER BY {column} IS NULL, {column} LIMIT ?)',
+                (culled,)
+            )
+        self._count(evictions=culled)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        return {
+            made[key]: value for key, value in self._fetch(list(made)).items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._store([(key, value)], timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            items.append((key, value))
+        self._store(items, timeout)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return bool(self._store([(key, value)], timeout, mode='ADD'))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        )
+        return bool(cursor.rowcount)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        cursor = self._db.executemany(
+            'DELETE FROM cache WHERE key = ?', [(key,) for key in keys]
+        )
+        self._count(deletes=cursor.rowcount)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._db.execute(
+            'SELECT 1 FROM cache '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self._db
+        # BEGIN IMMEDIATE сразу берёт блокировку записи: два процесса не
+        # прочитают одно и то же старое значение.
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT value FROM cache '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key)
+            )
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return value
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединения живут весь поток: открывать файл на каждый запрос
+        # дороже, чем держать его открытым.
+        pass
@@ -0,0 +1,100 @@
+"""Чтение из реплик базы.
+
+Представления, помеченные ``@replica_reads``, читают модели приложений из
+``REPLICA_APPS`` с одной из реплик ``DATABASE_REPLICAS``; всё остальное —
+запись, сессии, пользователи, очередь задач — идёт в ``default``.
+
+Реплика может отставать, поэтому посетитель, который только что что-то
+записал (любой небезопасный запрос), ещё ``REPLICA_STICKY_SECONDS`` секунд
+читает с основной базы: ``ReplicaMiddleware`` ставит ему короткоживущую
+cookie. Так он сразу видит свой пост или комментарий.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_state = threading.local()
+
+
+def replica_reads(view):
+    """Помечает представление как только читающее."""
+    view.replica_reads = True
+    return view
+
+
+def reading_replica():
+    return getattr(_state, 'replica', False)
+
+
+def read_primary():
+    """До конца запроса читать с основной базы."""
+    _state.replica = False
+
+
+@contextmanager
+def use_replica(enabled=True):
+    previous = reading_replica()
+    _state.replica = enabled
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+class ReplicaRouter:
+    def _aliases(self):
+        return {'default', *settings.DATABASE_REPLICAS}
+
+    def db_for_read(self, model, **hints):
+        if (
+            reading_replica() and settings.DATABASE_REPLICAS
+            and model._meta.app_label in settings.REPLICA_APPS
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        # Явно: иначе объект, прочитанный с реплики, записался бы туда же.
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = self._aliases()
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.sticky_primary = (
+            request.method not in SAFE_METHODS
+            or settings.REPLICA_STICKY_COOKIE in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.replica = False
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.replica = getattr(view_func, 'replica_reads', False) and (
+            not request.sticky_primary
+        )
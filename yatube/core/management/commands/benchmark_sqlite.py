@@ -0,0 +1,170 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+ROWS = 5000
+POSTS = 200
+
+
+def percentile(timings, share):
+    if not timings:
+        return 0
+    timings = sorted(timings)
+    return round(timings[min(int(len(timings) * share), len(timings) - 1)], 3)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite со стандартными '
+        'настройками и в режиме SQLITE_TUNED при параллельных чтении '
+        'и записи'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--json', action='store_true')
+
+    def modes(self):
+        return {
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'CONN_MAX_AGE': 0,
+            },
+            'tuned': {
+                'ENGINE': 'core.backends.sqlite3',
+                'CONN_MAX_AGE': settings.SQLITE_CONN_MAX_AGE,
+                'OPTIONS': {
+                    'pragmas': settings.SQLITE_PRAGMAS,
+                    'transaction_mode': 'IMMEDIATE',
+                },
+            },
+        }
+
+    def seed(self, path):
+        with sqlite3.connect(path) as db:
+            db.execute(
+                'CREATE TABLE bench_comment (id INTEGER PRIMARY KEY, '
+                'post_id INTEGER NOT NULL, text TEXT NOT NULL, '
+                'created REAL NOT NULL)'
+            )
+            db.execute(
+                'CREATE INDEX bench_comment_post ON bench_comment (post_id)'
+            )
+            db.executemany(
+                'INSERT INTO bench_comment (post_id, text, created) '
+                'VALUES (?, ?, ?)',
+                (
+                    (number % POSTS, f'Комментарий {number}', time.time())
+                    for number in range(ROWS)
+                ),
+            )
+        db.close()
+
+    def read(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'SELECT id, text FROM bench_comment WHERE post_id = %s '
+                'ORDER BY id DESC LIMIT 10',
+                [random.randrange(POSTS)],
+            )
+            cursor.fetchall()
+
+    def write(self, alias):
+        # Как при добавлении комментария: проверка, потом запись.
+        post_id = random.randrange(POSTS)
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    'SELECT COUNT(*) FROM bench_comment WHERE post_id = %s',
+                    [post_id],
+                )
+                cursor.fetchone()
+                cursor.execute(
+                    'INSERT INTO bench_comment (post_id, text, created) '
+                    'VALUES (%s, %s, %s)',
+                    [post_id, 'Новый комментарий', time.time()],
+                )
+
+    def worker(self, alias, operation, deadline, stats):
+        connection = connections[alias]
+        timings, errors = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                operation(alias)
+            except OperationalError:
+                errors += 1
+            else:
+                timings.append((time.perf_counter() - started) * 1000)
+            # Конец «запроса»: при CONN_MAX_AGE=0 соединение закрывается.
+            connection.close_if_unusable_or_obsolete()
+        connection.close()
+        with self.lock:
+            stats['timings'].extend(timings)
+            stats['errors'] += errors
+
+    def run(self, alias, options):
+        stats = {
+            name: {'timings': [], 'errors': 0}
+            for name in ('reads', 'writes')
+        }
+        deadline = time.perf_counter() + options['seconds']
+        threads = [
+            threading.Thread(
+                target=self.worker,
+                args=(alias, operation, deadline, stats[name]),
+            )
+            for name, operation, count in (
+                ('reads', self.read, options['readers']),
+                ('writes', self.write, options['writers']),
+            )
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report = {}
+        for name, result in stats.items():
+            timings = result['timings']
+            report[name] = {
+                'per_second': round(len(timings) / options['seconds'], 1),
+                'errors': result['errors'],
+                'p50_ms': percentile(timings, 0.5),
+                'p99_ms': percentile(timings, 0.99),
+            }
+        return report
+
+    def handle(self, *args, **options):
+        self.lock = threading.Lock()
+        report = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for mode, config in self.modes().items():
+                path = os.path.join(directory, f'{mode}.sqlite3')
+                self.seed(path)
+                alias = f'benchmark_{mode}'
+                connections.databases[alias] = dict(config, NAME=path)
+                try:
+                    report[mode] = self.run(alias, options)
+                finally:
+                    del connections.databases[alias]
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for mode, result in report.items():
+            for name, stats in result.items():
+                self.stdout.write(
+                    '{mode:<8} {name:<7} {per_second:>9.1f}/s '
+                    'p50 {p50_ms:>8.3f} ms p99 {p99_ms:>8.3f} ms '
+                    'errors {errors}'.format(mode=mode, name=name, **stats)
+                )
@@ -0,0 +1,78 @@
+import json
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.templates import configure, warm_up
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время отрисовки страниц с обычным и кеширующим '
+        'загрузчиком шаблонов (кеш фрагментов очищается перед запросом)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--json', action='store_true')
+
+    def pages(self):
+        post = Post.objects.select_related('author', 'group').filter(
+            group__isnull=False
+        ).first()
+        if post is None:
+            raise CommandError('Нужен хотя бы один пост в группе')
+        return {
+            'index': reverse('posts:index'),
+            'group_posts': reverse(
+                'posts:group_list', args=(post.group.slug,)
+            ),
+            'profile': reverse(
+                'posts:profile', args=(post.author.username,)
+            ),
+            'post_detail': reverse('posts:post_detail', args=(post.pk,)),
+            'follow_index': reverse('posts:follow_index'),
+        }
+
+    def measure(self, client, url, repeat):
+        client.get(url)
+        timings = []
+        for _ in range(repeat):
+            cache.clear()
+            started = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        return round(statistics.median(timings), 3)
+
+    def handle(self, *args, **options):
+        pages = self.pages()
+        user = User.objects.first()
+        report = {}
+        for mode, cached in (('uncached', False), ('cached', True)):
+            with override_settings(TEMPLATES=configure(cached)):
+                warm_up()
+                client = Client()
+                client.force_login(user)
+                for name, url in pages.items():
+                    report.setdefault(name, {})[mode] = self.measure(
+                        client, url, options['repeat']
+                    )
+        cache.clear()
+        for result in report.values():
+            result['speedup'] = round(
+                result['uncached'] / result['cached'], 2
+            )
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for name, result in report.items():
+            self.stdout.write(
+                '{name:<14} {uncached:>9.3f} ms -> {cached:>9.3f} ms '
+                '(x{speedup})'.format(name=name, **result)
+            )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.cache.server import EVICTION_POLICIES, Server, Store
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает встроенный RESP-сервер — замену Redis для разработки '
+        'и тестов бэкенда core.cache.redis.RedisCache'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=6379)
+        parser.add_argument(
+            '--max-entries', type=int, default=0,
+            help='Сколько записей хранить в одной базе (0 — без ограничения)'
+        )
+        parser.add_argument(
+            '--eviction', choices=EVICTION_POLICIES, default='allkeys-lru'
+        )
+
+    def handle(self, *args, **options):
+        store = Store(options['max_entries'], options['eviction'])
+        with Server((options['host'], options['port']), store) as server:
+            self.stdout.write(
+                f'Кеш-сервер слушает {options["host"]}:{options["port"]}'
+            )
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
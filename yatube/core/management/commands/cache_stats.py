@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+from core.cache.base import hit_ratio
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания, промахи и вытеснения общих кешей'
+
+    def handle(self, *args, **options):
+        for alias in settings.CACHES:
+            backend = caches[alias]
+            if not hasattr(backend, 'stats'):
+                self.stdout.write(f'{alias}: бэкенд не собирает метрики')
+                continue
+            stats = backend.stats()
+            ratio = hit_ratio(stats)
+            self.stdout.write(f'{alias}: ' + ', '.join(
+                f'{name}={value}' for name, value in stats.items()
+            ) + (f', hit_ratio={ratio:.1%}' if ratio is not None else ''))
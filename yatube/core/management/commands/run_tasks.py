@@ -0,0 +1,92 @@
+import functools
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import tasks
+
+
+def work(threads, poll_interval, once, stop):
+    """Цикл одного процесса: берёт задачи и раздаёт их потокам пула.
+
+    С одним потоком задачи выполняются прямо в текущем, на его соединении.
+    """
+    done = 0
+    with ThreadPoolExecutor(threads, thread_name_prefix='tasks') as pool:
+        if threads > 1:
+            run = functools.partial(pool.map, tasks.execute_and_close)
+        else:
+            run = functools.partial(map, tasks.execute)
+        while not stop.is_set():
+            tasks.requeue_stale()
+            claimed = tasks.claim(threads * 2)
+            if not claimed:
+                if once:
+                    break
+                stop.wait(poll_interval)
+                continue
+            done += sum(run(claimed))
+    return done
+
+
+def work_in_process(threads, poll_interval, once, stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        work(threads, poll_interval, once, stop)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет отложенные задачи из очереди core.tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=settings.TASKS_WORKER_THREADS,
+            help='Потоков на процесс'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Процессов-обработчиков (больше 1 — через fork)'
+        )
+        parser.add_argument('--poll-interval', type=float, default=1)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти'
+        )
+
+    def handle(self, *args, **options):
+        params = (
+            options['threads'], options['poll_interval'], options['once']
+        )
+        if options['processes'] <= 1:
+            stop = multiprocessing.Event()
+            try:
+                done = work(*params, stop)
+            except KeyboardInterrupt:
+                stop.set()
+                return
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+        # Дочерние процессы не должны унаследовать открытые соединения.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        processes = [
+            context.Process(target=work_in_process, args=(*params, stop))
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            while any(process.is_alive() for process in processes):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+        for process in processes:
+            process.join()
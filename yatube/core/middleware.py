@@ -0,0 +1,53 @@
+import logging
+import random
+
+from django.conf import settings
+
+from .queries import QueryRecorder, budget
+
+logger = logging.getLogger('core.queries')
+
+
+class QueryBudgetMiddleware:
+    """Считает SQL-запросы каждого запроса и сообщает о нарушителях.
+
+    Статистика доступна как ``request.query_stats``; запросы сверх бюджета
+    представления и повторяющийся SQL пишутся в лог ``core.queries``.
+    ``QUERY_BUDGET_SAMPLE_RATE`` ограничивает долю учитываемых запросов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_BUDGET_ENABLED or (
+            random.random() >= settings.QUERY_BUDGET_SAMPLE_RATE
+        ):
+            return self.get_response(request)
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        request.query_stats = recorder
+        self.report(request, response, recorder)
+        return response
+
+    def report(self, request, response, recorder):
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        limit = budget(view_name)
+        repeated = recorder.repeated()
+        if settings.QUERY_BUDGET_HEADER:
+            response['X-Query-Count'] = recorder.count
+            response['Server-Timing'] = (
+                f'db;dur={recorder.duration * 1000:.1f};'
+                f'desc="{recorder.count} queries"'
+            )
+        if recorder.count > limit:
+            logger.warning(
+                '%s: %s SQL-запросов при бюджете %s (%.1f мс)',
+                view_name, recorder.count, limit, recorder.duration * 1000
+            )
+        for sql, times in repeated.items():
+            logger.warning(
+                '%s: один и тот же SQL выполнен %s раз: %s',
+                view_name, times, sql
+            )
@@ -0,0 +1,66 @@
+"""Учёт SQL-запросов, выполненных за время HTTP-запроса.
+
+``QueryRecorder`` подключается через ``connection.execute_wrapper`` и
+считает запросы, их суммарное время и повторы одного и того же SQL
+(с разными параметрами это типичный N+1). Бюджеты на представления
+задаются настройкой ``QUERY_BUDGETS``.
+"""
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def repeated(self, threshold=None):
+        """SQL, выполненный не меньше ``threshold`` раз."""
+        if threshold is None:
+            threshold = settings.QUERY_REPEAT_THRESHOLD
+        return {
+            sql: times for sql, times in self.statements.items()
+            if times >= threshold
+        }
+
+
+def budget(view_name):
+    return settings.QUERY_BUDGETS.get(view_name, settings.QUERY_BUDGET_DEFAULT)
+
+
+class QueryBudgetTestMixin:
+    """Проверки для тестов по статистике, собранной middleware."""
+
+    def assertWithinQueryBudget(self, response):
+        stats = response.wsgi_request.query_stats
+        view_name = response.wsgi_request.resolver_match.view_name
+        self.assertLessEqual(
+            stats.count, budget(view_name),
+            f'{view_name}: {stats.count} запросов\n'
+            + '\n'.join(stats.statements)
+        )
+        self.assertEqual(stats.repeated(), {}, f'{view_name}: N+1')
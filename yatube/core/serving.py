@@ -0,0 +1,179 @@
+"""Отдача статики и медиафайлов самим приложением.
+
+В отличие от ``django.views.static.serve`` здесь есть всё, что обычно
+берёт на себя веб-сервер:
+
+- ``ETag`` и ``Last-Modified`` по ``stat`` файла и ответ ``304`` на
+  условный запрос;
+- запросы диапазонов (``Range``, ``If-Range``) с ответами ``206`` и ``416``;
+- заранее сжатые копии ``.br`` и ``.gz`` (их готовит ``collectstatic``,
+  см. ``core.staticfiles``), выбранные по ``Accept-Encoding``;
+- бессрочный ``Cache-Control: immutable`` для файлов с хешем в имени и
+  обязательная перепроверка для остальных.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotAllowed,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from .staticfiles import ENCODINGS
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Имена, которые даёт ManifestStaticFilesStorage: app.3f2a1b9c0d4e.css
+HASHED_STATIC = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+CHUNK_SIZE = 64 * 1024
+
+
+def _accepted(request, encoding):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        if name.strip().lower() == encoding:
+            return params.replace(' ', '') not in ('q=0', 'q=0.0')
+    return False
+
+
+def _variant(request, path):
+    """Путь к отдаваемому файлу и его Content-Encoding."""
+    for encoding, suffix in ENCODINGS:
+        if _accepted(request, encoding) and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def _byte_range(header, size):
+    """Запрошенный диапазон (start, end) включительно или None.
+
+    Несколько диапазонов сразу не поддерживаются: для них отдаётся весь
+    файл, что стандарт разрешает. Для невыполнимого диапазона —
+    ``ValueError``.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _if_range_passes(request, etag, last_modified):
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def _read(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_path(request, path, immutable=False):
+    """Ответ с содержимым файла ``path`` на диске."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(('GET', 'HEAD'))
+    if not os.path.isfile(path):
+        raise Http404
+    source, encoding = _variant(request, path)
+    stat = os.stat(source)
+    last_modified = int(stat.st_mtime)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = HttpResponse()
+    headers['ETag'] = etag
+    headers['Last-Modified'] = http_date(last_modified)
+    headers['Cache-Control'] = (
+        f'public, max-age={settings.FILES_MAX_AGE}, immutable'
+        if immutable else 'public, max-age=0, must-revalidate'
+    )
+    patch_vary_headers(headers, ('Accept-Encoding',))
+    conditional = get_conditional_response(
+        request, etag, last_modified, headers
+    )
+    if conditional is not headers:
+        return conditional
+
+    size = stat.st_size
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    try:
+        byte_range = (
+            _byte_range(request.META.get('HTTP_RANGE', ''), size)
+            if encoding is None
+            and _if_range_passes(request, etag, last_modified) else None
+        )
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read(open(source, 'rb'), start, end - start + 1),
+            status=206, content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        size = end - start + 1
+    else:
+        response = FileResponse(
+            open(source, 'rb'), content_type=content_type
+        )
+    for header, value in headers.items():
+        response[header] = value
+    response['Content-Length'] = size
+    response['Accept-Ranges'] = 'bytes' if encoding is None else 'none'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def static(request, path):
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path) and settings.DEBUG:
+        # Без collectstatic файлы берутся прямо из каталогов приложений.
+        full_path = finders.find(path) or full_path
+    return serve_path(
+        request, full_path, immutable=bool(HASHED_STATIC.search(path))
+    )
+
+
+def media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    # Файл, названный по хешу содержимого, под этим именем не меняется.
+    is_addressed = getattr(default_storage, 'is_addressed', None)
+    immutable = is_addressed is not None and is_addressed(path)
+    return serve_path(request, full_path, immutable=immutable)
@@ -0,0 +1,69 @@
+"""Хранилище статики: имена с хешем и заранее сжатые копии.
+
+``collectstatic`` кладёт в ``STATIC_ROOT`` файлы с хешем содержимого в имени
+(``css/app.3f2a1b9c0d4e.css``), которые можно кешировать бессрочно, и рядом
+с каждым сжимаемым файлом — ``.gz`` и, если установлен пакет ``brotli``,
+``.br``. Отдаёт их ``core.serving``, выбирая вариант по ``Accept-Encoding``.
+"""
+import gzip
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    HashedFilesMixin, ManifestStaticFilesStorage,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress
+
+
+def compress(path):
+    """Пишет сжатые копии файла; возвращает список созданных путей.
+
+    Копия остаётся, только если она заметно меньше оригинала.
+    """
+    if not path.endswith(settings.STATIC_COMPRESS_EXTENSIONS):
+        return []
+    with open(path, 'rb') as source:
+        data = source.read()
+    if len(data) < settings.STATIC_COMPRESS_MIN_SIZE:
+        return []
+    created = []
+    for suffix, compressor in _compressors():
+        packed = compressor(data)
+        if len(packed) > len(data) * 0.9:
+            continue
+        with open(path + suffix, 'wb') as target:
+            target.write(packed)
+        created.append(path + suffix)
+    return created
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if self.exists(name):
+                compress(self.path(name))
+
+    def url(self, name, force=False):
+        # Пока collectstatic не запускали, манифеста нет: в разработке и
+        # тестах статика отдаётся под исходными именами.
+        if not self.hashed_files and not os.path.exists(
+            self.path(self.manifest_name)
+        ):
+            return super(HashedFilesMixin, self).url(name)
+        return super().url(name, force)
@@ -0,0 +1,75 @@
+"""Файловое хранилище, адресуемое по содержимому.
+
+Имя файла — SHA-256 его байтов, разложенный по подкаталогам:
+``posts/3f/a2/3fa2…e1.jpg``. Одинаковые файлы получают одно имя и
+записываются один раз, а переименований с суффиксом ``_xyz`` не бывает.
+В каталоге оказывается не больше 256 подкаталогов, поэтому поиск файла не
+упирается в длинные листинги.
+
+Удалять файл можно, только когда на него не ссылается ни одна запись: это
+отслеживает приложение (для постов — ``posts.media``). Запись, получившая
+уже существующий файл, может быть ещё не зафиксирована, поэтому ``save``
+обновляет время изменения такого файла, а удаляются только давние.
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASHED_NAME = re.compile(
+    r'(?:^|/)(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/'
+    r'(?P<digest>(?P=a)(?P=b)[0-9a-f]{60})(?:\.\w+)?$'
+)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    shard_depth = 2
+    shard_width = 2
+
+    def digest(self, content):
+        sha = hashlib.sha256()
+        for chunk in content.chunks():
+            sha.update(chunk)
+        return sha.hexdigest()
+
+    def hashed_name(self, name, digest):
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        shards = [
+            digest[index:index + self.shard_width]
+            for index in range(
+                0, self.shard_depth * self.shard_width, self.shard_width
+            )
+        ]
+        return posixpath.join(directory, *shards, digest + extension)
+
+    def is_addressed(self, name):
+        """Имя выдано этим хранилищем, а не осталось от прежней схемы."""
+        return bool(name) and HASHED_NAME.search(name) is not None
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, self.digest(content))
+        if self.exists(name):
+            # Те же байты уже лежат под этим именем. Время изменения
+            # обновляется: свежий файл не удаляется как потерявший ссылки.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def addressed_files(self, directory=''):
+        """Имена адресуемых по содержимому файлов внутри каталога."""
+        root = self.path(directory)
+        for path, _, files in os.walk(root):
+            for filename in files:
+                name = os.path.relpath(
+                    os.path.join(path, filename), self.location
+                ).replace(os.sep, '/')
+                if self.is_addressed(name):
+                    yield name
@@ -0,0 +1,135 @@
+"""Очередь отложенных задач в базе данных.
+
+Функция, обёрнутая в ``@task``, ставится в очередь вызовом ``.delay()``:
+строка ``Task`` пишется в той же транзакции, что и данные, поэтому
+обработчик (``manage.py run_tasks``) увидит задачу только после коммита.
+При ``TASKS_EAGER`` задачи выполняются сразу — это режим для отладки
+без обработчика и для тестов, проверяющих результат задач.
+
+Упавшая задача повторяется с экспоненциальной паузой до ``max_attempts``
+раз, затем остаётся в статусе ``failed`` с текстом ошибки.
+"""
+import functools
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFunction:
+    def __init__(self, func, max_attempts=None, retry_delay=None):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Ставит вызов в очередь (или выполняет сразу при TASKS_EAGER)."""
+        if settings.TASKS_EAGER:
+            try:
+                self.func(*args, **kwargs)
+            except Exception:
+                logger.exception('Задача %s упала', self.name)
+            return None
+        return Task.objects.create(
+            name=self.name,
+            payload=json.dumps({'args': args, 'kwargs': kwargs}),
+            max_attempts=self.max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        )
+
+
+def task(func=None, *, max_attempts=None, retry_delay=None):
+    """Декоратор задачи; аргументы должны сериализоваться в JSON."""
+    if func is None:
+        return functools.partial(
+            task, max_attempts=max_attempts, retry_delay=retry_delay
+        )
+    return TaskFunction(func, max_attempts, retry_delay)
+
+
+def worker_name():
+    return (
+        f'{socket.gethostname()}:{os.getpid()}:'
+        f'{threading.get_ident()}:{uuid.uuid4().hex[:6]}'
+    )[-64:]
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи обработчиков, переставших отвечать."""
+    deadline = timezone.now() - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=deadline
+    ).update(status=Task.QUEUED, locked_by='')
+
+
+def claim(limit, worker=None):
+    """Забирает до limit готовых задач так, что их не возьмёт никто другой.
+
+    Один ``UPDATE`` с повторной проверкой статуса работает и в SQLite, где
+    нет ``SELECT ... FOR UPDATE SKIP LOCKED``.
+    """
+    worker = worker or worker_name()
+    now = timezone.now()
+    ready = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'pk').values('pk')[:limit]
+    Task.objects.filter(pk__in=ready, status=Task.QUEUED).update(
+        status=Task.RUNNING, locked_by=worker, locked_at=now
+    )
+    return list(Task.objects.filter(status=Task.RUNNING, locked_by=worker))
+
+
+def execute(item):
+    """Выполняет взятую задачу и записывает результат."""
+    function = None
+    try:
+        function = import_string(item.name)
+        payload = json.loads(item.payload)
+        function(*payload.get('args', ()), **payload.get('kwargs', {}))
+    except Exception:
+        item.attempts += 1
+        item.last_error = traceback.format_exc()
+        item.locked_by = ''
+        if item.attempts >= item.max_attempts:
+            item.status = Task.FAILED
+            logger.exception('Задача %s (#%s) не выполнена', item.name,
+                             item.pk)
+        else:
+            item.status = Task.QUEUED
+            delay = getattr(function, 'retry_delay', None)
+            item.run_at = timezone.now() + timedelta(seconds=(
+                (delay or settings.TASKS_RETRY_DELAY)
+                * 2 ** (item.attempts - 1)
+            ))
+        item.save(update_fields=(
+            'attempts', 'last_error', 'locked_by', 'status', 'run_at'
+        ))
+        return False
+    Task.objects.filter(pk=item.pk).delete()
+    return True
+
+
+def execute_and_close(item):
+    # Потоки пула держат собственные соединения; закрываем их после
+    # каждой задачи, чтобы не копить открытые транзакции и файлы.
+    try:
+        return execute(item)
+    finally:
+        connection.close()
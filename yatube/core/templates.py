@@ -0,0 +1,68 @@
+"""Режим шаблонов с кеширующим загрузчиком и его прогрев."""
+import copy
+import os
+
+from django.conf import settings
+from django.template import (
+    TemplateDoesNotExist, TemplateSyntaxError, engines
+)
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+from django.template.utils import get_app_template_dirs
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+
+def configure(cached):
+    """Копия ``settings.TEMPLATES`` с кешем загрузчика или без него."""
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for backend in templates:
+        if backend['BACKEND'] != (
+            'django.template.backends.django.DjangoTemplates'
+        ):
+            continue
+        loaders = backend['OPTIONS']['loaders']
+        if loaders and loaders[0][0] == CACHED_LOADER:
+            loaders = loaders[0][1]
+        backend['OPTIONS']['loaders'] = (
+            [(CACHED_LOADER, loaders)] if cached else loaders
+        )
+    return templates
+
+
+def _names(directories):
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(('.html', '.txt')):
+                    yield os.path.relpath(
+                        os.path.join(root, name), directory
+                    ).replace(os.sep, '/')
+
+
+def warm_up():
+    """Заранее разбирает все шаблоны; возвращает число закешированных.
+
+    Без кеширующего загрузчика прогрев бесполезен и ничего не делает.
+    """
+    warmed = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        engine = backend.engine
+        if not any(isinstance(loader, CachedLoader)
+                   for loader in engine.template_loaders):
+            continue
+        directories = list(engine.dirs)
+        if engine.app_dirs or any(
+            'app_directories' in str(loader)
+            for loader in engine.loaders
+        ):
+            directories += get_app_template_dirs('templates')
+        for name in set(_names(directories)):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                continue
+            warmed += 1
+    return warmed
@@ -0,0 +1,234 @@
+"""JSON API лент только для чтения.
+
+Посты выбираются с ``.only()`` — ровно те столбцы, что попадают в ответ, —
+и листаются тем же ``CursorPaginator``, что и HTML-ленты
+(``?cursor=``, размер страницы — ``?limit=``). Список кодируется по одному
+объекту прямо в поток ответа.
+
+``ETag`` собирается из поколений ``feed_cache`` и адреса запроса, поэтому
+на ``If-None-Match`` с неизменившейся лентой отдаётся ``304`` без выборки
+постов. Только лента подписок, у которой нет своего поколения, считает
+``ETag`` по выбранной странице — но и она не кодируется заново.
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, JsonResponse, StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from core.db import replica_reads
+
+from . import feed_cache
+from .conditional import etag as make_etag, generations
+from .feeds import follow_feed
+from .models import Comment, Group, Post, User
+from .utils import CursorPaginator, InvalidCursor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+VERSION = 1
+POST_FIELDS = (
+    'text', 'pub_date', 'image', 'thumbnails',
+    'author__username', 'group__slug',
+)
+COMMENT_FIELDS = ('text', 'created', 'post', 'author__username')
+CONTENT_TYPE = 'application/json'
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return _encoder.encode(data).encode()
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'thumbnails': post.thumbnail,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+        'author': comment.author.username if comment.author_id else None,
+    }
+
+
+def _stream(items, serialize, extra):
+    yield b'{"results":['
+    for index, item in enumerate(items):
+        if index:
+            yield b','
+        yield dumps(serialize(item))
+    tail = dumps(extra)
+    yield b']' + (b',' + tail[1:] if extra else b'}')
+
+
+def _error(message, status):
+    return JsonResponse(
+        {'detail': message}, status=status,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def api_view(view):
+    """Только GET/HEAD с чтением из реплик, ошибки — JSON вместо HTML."""
+    @replica_reads
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = _error('Метод не поддерживается', 405)
+            response['Allow'] = 'GET, HEAD'
+            return response
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return _error('Не найдено', 404)
+        except InvalidCursor:
+            return _error('Некорректный курсор страницы', 400)
+    return wrapper
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.POSTS_IN_PAGE))
+    except ValueError:
+        limit = settings.POSTS_IN_PAGE
+    return min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def _etag(request, *parts):
+    return make_etag(request, VERSION, *parts)
+
+
+def _conditional(request, etag, build):
+    """304 на совпавший If-None-Match, иначе ответ build()."""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _page(request, posts, ordering=('-pub_date', '-pk')):
+    paginator = CursorPaginator(posts, _limit(request), ordering=ordering)
+    page = paginator.page(request.GET.get('cursor'))
+    return page, list(page)
+
+
+def _list_response(page, items, serialize, **extra):
+    extra.update(
+        next=page.keyset.next_cursor, previous=page.keyset.previous_cursor
+    )
+    return StreamingHttpResponse(
+        _stream(items, serialize, extra), content_type=CONTENT_TYPE
+    )
+
+
+def _feed(request, posts, *scopes):
+    etag = _etag(request, *generations(*scopes))
+
+    def build():
+        page, items = _page(request, posts)
+        return _list_response(page, items, serialize_post)
+    return _conditional(request, etag, build)
+
+
+@api_view
+def index(request):
+    posts = Post.objects.select_related('author', 'group').only(*POST_FIELDS)
+    return _feed(request, posts, 'index')
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('slug'), slug=slug)
+    posts = group.posts.select_related('author').only(
+        'group', *POST_FIELDS[:-1]
+    )
+    return _feed(request, posts, f'group:{group.pk}')
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    posts = Post.objects.filter(author=author).select_related(
+        'author', 'group'
+    ).only(*POST_FIELDS)
+    return _feed(request, posts, f'profile:{author.pk}')
+
+
+def _existing_post(post_id):
+    # До поколений: иначе каждый несуществующий id оставлял бы в кеше
+    # бессрочные ключи.
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+
+
+@api_view
+def post_detail(request, post_id):
+    _existing_post(post_id)
+    scopes = (f'post:{post_id}', f'card:{post_id}')
+    etag = _etag(request, *generations(*scopes))
+
+    def build():
+        post = get_object_or_404(
+            Post.objects.select_related('author', 'group').only(
+                *POST_FIELDS
+            ),
+            pk=post_id
+        )
+        return HttpResponse(
+            dumps(serialize_post(post)), content_type=CONTENT_TYPE
+        )
+    return _conditional(request, etag, build)
+
+
+@api_view
+def post_comments(request, post_id):
+    _existing_post(post_id)
+    etag = _etag(request, *generations(f'post:{post_id}'))
+
+    def build():
+        comments = Comment.objects.filter(post_id=post_id).select_related(
+            'author'
+        ).only(*COMMENT_FIELDS)
+        page, items = _page(request, comments, ordering=('created', 'pk'))
+        return _list_response(page, items, serialize_comment)
+    return _conditional(request, etag, build)
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error('Нужна авторизация', 401)
+    page, posts = _page(request, follow_feed(request.user))
+    # У ленты подписок нет своего поколения: версию дают посты страницы.
+    etag = _etag(
+        request, request.user.pk, *(post.pk for post in posts),
+        *feed_cache.generations(*(f'card:{post.pk}' for post in posts))
+    )
+    response = _conditional(
+        request, etag,
+        lambda: _list_response(page, posts, serialize_post)
+    )
+    patch_cache_control(response, private=True)
+    return response
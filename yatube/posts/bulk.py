@@ -0,0 +1,220 @@
+"""Потоковый импорт и экспорт данных в JSONL и CSV.
+
+Строки читаются и пишутся по одной, в базу попадают пачками через
+``bulk_create`` — каждая пачка в своей транзакции. Пользователи и группы в
+файлах задаются естественными ключами (``username`` и ``slug``), посты и
+комментарии — своими ``id``.
+
+``bulk_create`` не отправляет сигналы, поэтому после импорта ленты
+подписок, счётчики, поисковый индекс и кеш лент пересобираются целиком
+(``refresh``).
+"""
+import csv
+import json
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import counters, feed_cache, feeds, search
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+
+SCHEMAS = {
+    'group': (Group, ('id', 'title', 'slug', 'description')),
+    'post': (
+        Post, (
+            'id', 'text', 'pub_date', 'author', 'group', 'image',
+            'image_hash',
+        )
+    ),
+    'comment': (Comment, ('id', 'post', 'author', 'text', 'created')),
+    'follow': (Follow, ('user', 'author')),
+}
+
+NATURAL_KEYS = {User: 'username', Group: 'slug'}
+
+
+def _key(field):
+    """Поле связанной модели, которым связь записывается в файл."""
+    return NATURAL_KEYS.get(field.related_model, 'pk')
+
+
+def _lookups(model, columns):
+    lookups = []
+    for column in columns:
+        field = model._meta.get_field(column)
+        if not field.is_relation:
+            lookups.append(column)
+        elif _key(field) == 'pk':
+            lookups.append(field.attname)
+        else:
+            lookups.append(f'{column}__{_key(field)}')
+    return lookups
+
+
+def _dump(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def export_rows(kind, batch_size=1000):
+    model, columns = SCHEMAS[kind]
+    rows = model.objects.order_by('pk').values_list(
+        *_lookups(model, columns)
+    )
+    for row in rows.iterator(chunk_size=batch_size):
+        yield dict(zip(columns, map(_dump, row)))
+
+
+def read(stream, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write(stream, fmt, kind, rows):
+    columns = SCHEMAS[kind][1]
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, columns)
+        writer.writeheader()
+    for count, row in enumerate(rows, 1):
+        if fmt == 'csv':
+            writer.writerow(row)
+        else:
+            stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        yield count
+
+
+class Resolver:
+    """Переводит естественные ключи связей в id, запоминая найденные."""
+
+    def __init__(self):
+        self.known = {}
+
+    def resolve(self, field, values):
+        model, key = field.related_model, _key(field)
+        known = self.known.setdefault((model, key), {})
+        missing = {value for value in values if value not in known}
+        if missing:
+            known.update(model.objects.filter(
+                **{f'{key}__in': missing}
+            ).values_list(key, 'pk'))
+        unknown = missing - set(known)
+        if unknown:
+            raise ValueError(
+                f'{model._meta.verbose_name}: не найдены '
+                f'{", ".join(sorted(map(str, unknown))[:10])}'
+            )
+        return known
+
+
+def _convert(field, value):
+    if value is None or value == '' and (
+        field.null or field.primary_key or field.is_relation
+    ):
+        return None
+    if field.is_relation:
+        related = field.related_model._meta
+        key = _key(field)
+        field = related.pk if key == 'pk' else related.get_field(key)
+    return field.to_python(value)
+
+
+def _objects(model, columns, rows, resolver):
+    fields = [model._meta.get_field(column) for column in columns]
+    values = [
+        [_convert(field, row.get(field.name)) for field in fields]
+        for row in rows
+    ]
+    for index, field in enumerate(fields):
+        if field.is_relation and _key(field) != 'pk':
+            known = resolver.resolve(field, {
+                row[index] for row in values if row[index] is not None
+            })
+            for row in values:
+                if row[index] is not None:
+                    row[index] = known[row[index]]
+    dated = [
+        field for field in fields if getattr(field, 'auto_now_add', False)
+    ]
+    now = timezone.now()
+    objects = []
+    for row in values:
+        data = {
+            field.attname: value
+            for field, value in zip(fields, row)
+            if value is not None or field.null
+        }
+        for field in dated:
+            data.setdefault(field.attname, now)
+        objects.append(model(**data))
+    return objects
+
+
+@contextmanager
+def _keep_dates(model):
+    # bulk_create проставляет полям с auto_now_add текущее время и
+    # затёр бы даты из файла; на время импорта атрибут выключается.
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_rows(kind, rows, batch_size=1000, ignore_conflicts=False):
+    """Сохраняет строки пачками; после каждой отдаёт число сохранённых."""
+    model, columns = SCHEMAS[kind]
+    resolver = Resolver()
+    total = 0
+    with _keep_dates(model):
+        for batch in _batches(rows, batch_size):
+            objects = _objects(model, columns, batch, resolver)
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    objects, ignore_conflicts=ignore_conflicts
+                )
+            total += len(objects)
+            yield total
+    # Явные id не сдвигают последовательности в PostgreSQL и Oracle.
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+def refresh(kinds):
+    """Пересобирает то, что при сохранении обновляют сигналы."""
+    if {'post', 'follow'} & set(kinds):
+        counters.repair()
+        cache.delete(feeds.HOT_AUTHORS_KEY)
+        if settings.FOLLOW_FEED_MATERIALIZED:
+            feeds.rebuild()
+    if 'post' in kinds:
+        search.get_backend().rebuild()
+    feed_cache.bump(feed_cache.GLOBAL)
@@ -0,0 +1,94 @@
+"""Условные GET-запросы к страницам лент.
+
+``ETag`` страницы собирается без выборки постов: из поколений
+``feed_cache`` её областей, адреса запроса и того, что на странице зависит
+от посетителя (пользователь и CSRF-токен в формах). Поколения меняются
+сигналами при любой правке постов, комментариев, групп, имён авторов и
+счётчиков (область ``stats:<id>``), поэтому совпавший ``If-None-Match``
+означает, что страница не изменилась, и в ответ уходит ``304``.
+
+Страница, области которой менялись последние ``REPLICA_STICKY_SECONDS``,
+читается с основной базы (``generations``): иначе отставшая реплика попала бы
+в кеш страниц и браузеров под новым ETag.
+
+Ответы помечаются ``Vary: Cookie``: анонимная страница и страница
+пользователя кешируются браузером и прокси раздельно, а страницы
+пользователей — только браузером (``private``). Анонимам страница
+отдаётся из кеша готовых страниц (``posts.page_cache``) по тому же ETag.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+
+from core.db import read_primary, reading_replica
+
+from . import feed_cache, page_cache
+
+
+def etag(request, *parts):
+    """Сильный ETag из адреса запроса, версии выпуска и частей parts."""
+    key = ':'.join(map(str, (
+        settings.PAGES_VERSION, request.get_full_path()
+    ) + parts))
+    return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+
+def generations(*scopes):
+    """Поколения областей для ETag; недавно изменённые — с основной базы."""
+    values = feed_cache.generations(*scopes)
+    if reading_replica() and feed_cache.recently_bumped(*scopes):
+        read_primary()
+    return values
+
+
+def page_etag(request, *scopes):
+    """ETag HTML-страницы, показывающей области scopes.
+
+    CSRF-токен есть только в формах для вошедших пользователей, поэтому
+    у анонимов ETag от него не зависит.
+    """
+    visitor = ()
+    if request.user.is_authenticated:
+        visitor = (request.user.pk, request.META.get('CSRF_COOKIE', ''))
+    return etag(request, *visitor, *generations(*scopes))
+
+
+def conditional_page(etag_func):
+    """Условный GET и кеш анонимных страниц для представления ленты.
+
+    etag_func получает аргументы представления и может вернуть None —
+    тогда страница отдаётся как обычно (например, чтобы представление
+    само ответило 404).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            tag = None
+            if request.method in ('GET', 'HEAD'):
+                tag = etag_func(request, *args, **kwargs)
+            if tag is None:
+                return view(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=tag)
+            if response is None:
+                response = page_cache.get(request, tag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                page_cache.store(request, tag, response)
+            if response.status_code not in (200, 304):
+                return response
+            response.setdefault('ETag', tag)
+            audience = (
+                {'private': True} if request.user.is_authenticated
+                else {'public': True}
+            )
+            patch_cache_control(
+                response, no_cache=True, must_revalidate=True, **audience
+            )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
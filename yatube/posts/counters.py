@@ -0,0 +1,103 @@
+"""Денормализованные счётчики постов, подписчиков и подписок.
+
+Счётчики меняются атомарным ``UPDATE ... SET n = n + d`` из сигналов в той же
+транзакции, что и сама запись. Строка ``AuthorStats`` создаётся лениво
+точным пересчётом; команда ``repair_stats`` исправляет накопившийся дрейф
+(например, после ``bulk_create``).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from . import feed_cache
+from .models import AuthorStats, Follow, Post, User
+
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def with_counts(users):
+    """Пользователи с точными значениями счётчиков в аннотациях."""
+    return users.annotate(**{
+        f'exact_{name}': _subquery(model, field)
+        for name, (model, field) in COUNTERS.items()
+    })
+
+
+def _create(user_id):
+    user = with_counts(User.objects.filter(pk=user_id)).first()
+    if user is None:
+        return None
+    try:
+        with transaction.atomic():
+            return AuthorStats.objects.create(user_id=user_id, **{
+                name: getattr(user, f'exact_{name}') for name in COUNTERS
+            })
+    except IntegrityError:
+        return AuthorStats.objects.get(user_id=user_id)
+
+
+def get(user):
+    stats = AuthorStats.objects.filter(user=user).first()
+    return stats or _create(user.pk)
+
+
+def change(user_id, **deltas):
+    # Счётчики видны на страницах профиля и поста: их ETag зависит от
+    # stats:<id>.
+    feed_cache.bump(f'stats:{user_id}')
+    # Greatest не даёт разошедшемуся счётчику уйти ниже нуля.
+    updated = AuthorStats.objects.filter(user_id=user_id).update(**{
+        name: Greatest(F(name) + delta, 0) for name, delta in deltas.items()
+    })
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        # Новая строка считается по таблицам, где изменение уже учтено.
+        # При удалении строку не создаём: пользователь может удаляться
+        # каскадом, а недостающая строка всё равно посчитается при чтении.
+        _create(user_id)
+
+
+def repair(batch_size=1000, dry_run=False):
+    """Сверяет счётчики с таблицами; возвращает число исправленных строк."""
+    users = with_counts(User.objects.select_related('stats')).order_by('pk')
+    changed, missing, repaired = [], [], 0
+    for user in users.iterator(chunk_size=batch_size):
+        exact = {name: getattr(user, f'exact_{name}') for name in COUNTERS}
+        stats = getattr(user, 'stats', None)
+        if stats is None:
+            if not any(exact.values()):
+                continue
+            missing.append(AuthorStats(user=user, **exact))
+        elif any(getattr(stats, name) != value
+                 for name, value in exact.items()):
+            for name, value in exact.items():
+                setattr(stats, name, value)
+            changed.append(stats)
+        else:
+            continue
+        repaired += 1
+        if not dry_run and len(changed) + len(missing) >= batch_size:
+            _save(changed, missing)
+            changed, missing = [], []
+    if not dry_run:
+        _save(changed, missing)
+        if repaired:
+            feed_cache.bump(feed_cache.GLOBAL)
+    return repaired
+
+
+def _save(changed, missing):
+    with transaction.atomic():
+        AuthorStats.objects.bulk_update(changed, list(COUNTERS))
+        AuthorStats.objects.bulk_create(missing, ignore_conflicts=True)
@@ -0,0 +1,244 @@
+"""Версионированный кеш фрагментов лент.
+
+Ключ фрагмента собирается из счётчиков поколений его областей (``index``,
+``group:<id>``, ``profile:<id>``, ``post:<id>`` и общей ``all``) и номера
+страницы или курсора. Сигналы моделей увеличивают счётчики, поэтому
+старые фрагменты просто перестают запрашиваться и вытесняются кешем.
+
+Число постов ленты для нумерованного пагинатора (``page_count``) берётся
+по стратегии из ``FEED_COUNT_STRATEGIES`` и тоже кешируется по поколениям.
+
+Карточки постов кешируются отдельно, по одной на пост (``card:<id>``):
+страница ленты, собранная заново, берёт их одним ``get_many``.
+
+Область ``stats:<id>`` меняется вместе со счётчиками пользователя; она
+нужна только для ETag страниц (``posts.conditional``).
+
+Если настроены реплики, ``bump`` ещё и отмечает области на
+``REPLICA_STICKY_SECONDS``: страницы недавно изменённых областей
+рисуются с основной базы, чтобы отставшая реплика не попала в кеш под
+новым поколением.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post
+
+GLOBAL = 'all'
+GENERATION_KEY = 'feed-gen:{}'
+BUMPED_KEY = 'feed-bumped:{}'
+COUNT_KEY = 'feed-count:{}:{}'
+CARD_TEMPLATE = 'posts/includes/card_post.html'
+
+
+def _initial():
+    # Счётчик, вытесненный из кеша, не должен вернуться к старому значению:
+    # иначе снова совпадут ключи устаревших фрагментов.
+    return int(time.time() * 1000)
+
+
+def generations(*scopes):
+    keys = [GENERATION_KEY.format(scope) for scope in (GLOBAL,) + scopes]
+    found = cache.get_many(keys)
+    missing = {key: _initial() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    if settings.DATABASE_REPLICAS:
+        # Отметка ставится до нового поколения: кто увидел поколение,
+        # увидит и её (см. recently_bumped).
+        cache.set_many(
+            {BUMPED_KEY.format(scope): True for scope in scopes},
+            settings.REPLICA_STICKY_SECONDS,
+        )
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial(), None)
+
+
+def recently_bumped(*scopes):
+    """Менялась ли хоть одна из областей за ``REPLICA_STICKY_SECONDS``.
+
+    Столько же может отставать реплика: данные, давшие новое поколение,
+    на ней может ещё не быть.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return False
+    return bool(cache.get_many([
+        BUMPED_KEY.format(scope) for scope in (GLOBAL,) + scopes
+    ]))
+
+
+def post_scopes(post, *group_ids):
+    """Области, в которых показывается пост."""
+    scopes = {
+        'index',
+        f'profile:{post.author_id}',
+        f'post:{post.pk}',
+        f'card:{post.pk}',
+    }
+    for group_id in (post.group_id,) + group_ids:
+        if group_id is not None:
+            scopes.add(f'group:{group_id}')
+    return scopes
+
+
+def author_scopes(user_id):
+    """Области, в которых показывается имя пользователя."""
+    posts = Post.objects.filter(author_id=user_id)
+    scopes = {'index', f'profile:{user_id}'}
+    scopes.update(
+        f'card:{post_id}' for post_id in posts.values_list('pk', flat=True)
+    )
+    scopes.update(
+        f'group:{group_id}' for group_id in posts.exclude(
+            group=None
+        ).values_list('group_id', flat=True).distinct()
+    )
+    # Имя стоит и под комментариями на чужих страницах постов.
+    scopes.update(
+        f'post:{post_id}' for post_id in Comment.objects.filter(
+            author_id=user_id
+        ).values_list('post_id', flat=True).distinct()
+    )
+    return scopes
+
+
+def fragment_key(request, *scopes):
+    """Ключ фрагмента ленты для тега ``{% cache %}``."""
+    if 'page' in request.GET:
+        page = 'page=' + request.GET['page']
+    else:
+        page = request.GET.get('cursor', '')
+    versions = '.'.join(str(value) for value in generations(*scopes))
+    return f'{":".join(scopes)}:{versions}:{page}'
+
+
+def context(request, *scopes):
+    return {
+        'feed_cache_key': fragment_key(request, *scopes),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+
+
+def _bounded_count(queryset, limit):
+    """Точное число, если оно не больше limit; иначе limit + 1."""
+    return queryset.order_by().values('pk')[:limit + 1].count()
+
+
+def _estimate(queryset):
+    """Оценка числа строк таблицы по статистике планировщика.
+
+    Работает только для запросов без условий; статистику собирает
+    ``ANALYZE``. Если её нет, возвращает None.
+    """
+    if queryset.query.where:
+        return None
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                [table]
+            )
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s', [table]
+            )
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] >= 0 else None
+    return None
+
+
+def page_count(feed, queryset, *scopes, known=None):
+    """Число объектов ленты feed по стратегии ``FEED_COUNT_STRATEGIES``.
+
+    * ``exact`` — ``COUNT(*)`` на каждый запрос;
+    * ``cached`` — точное число в кеше, ключ зависит от поколений scopes,
+      поэтому запись в ленту сразу даёт пересчёт;
+    * ``periodic`` — число в кеше на ``FEED_COUNT_TIMEOUT`` секунд без
+      оглядки на записи;
+    * ``estimate`` — оценка по статистике базы (без неё точное число),
+      хранится в кеше как у ``periodic``;
+    * ``counter`` — готовое денормализованное значение known.
+
+    Кроме ``exact`` и ``cached``, ленты не длиннее ``FEED_COUNT_EXACT_LIMIT``
+    считаются точно ограниченным запросом.
+    """
+    strategy = settings.FEED_COUNT_STRATEGIES.get(feed, 'exact')
+    if strategy == 'counter' and known is not None:
+        return known
+    if strategy == 'exact':
+        return queryset.count()
+    limit = settings.FEED_COUNT_EXACT_LIMIT
+    if strategy == 'cached':
+        version = '.'.join(str(value) for value in generations(*scopes))
+    else:
+        # В кеше только числа длинных лент: пока оно там, ограниченный
+        # COUNT не нужен. Короткие ленты считаются точно каждый раз.
+        version = f'periodic-{limit}'
+    key = COUNT_KEY.format(':'.join((feed,) + scopes), version)
+    count = cache.get(key)
+    if count is not None:
+        return count
+    if strategy in ('periodic', 'estimate', 'counter'):
+        small = _bounded_count(queryset, limit)
+        if small <= limit:
+            return small
+    if strategy == 'estimate':
+        estimate = _estimate(queryset)
+        if estimate is not None:
+            count = max(estimate, limit + 1)
+    if count is None:
+        count = queryset.count()
+    cache.set(key, count, settings.FEED_COUNT_TIMEOUT)
+    return count
+
+
+def cards(posts, flag_profile=False, flag_group=False):
+    """HTML карточек постов; отрисовываются только отсутствующие в кеше.
+
+    Версия карточки — поколения ``card:<id>`` и общей области, поэтому
+    правка поста, смена картинки или группы сразу дают новый ключ.
+    """
+    posts = list(posts)
+    if not posts:
+        return []
+    versions = generations(*(f'card:{post.pk}' for post in posts))
+    flags = f'{int(flag_profile)}{int(flag_group)}'
+    keys = [
+        f'card:{post.pk}:{flags}:{versions[0]}.{version}'
+        for post, version in zip(posts, versions[1:])
+    ]
+    found = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in found:
+            missing[key] = render_to_string(CARD_TEMPLATE, {
+                'post': post,
+                'flag_profile': flag_profile,
+                'flag_group': flag_group,
+            })
+    if missing:
+        cache.set_many(missing, settings.FEED_CACHE_TIMEOUT)
+        found.update(missing)
+    return [mark_safe(found[key]) for key in keys]
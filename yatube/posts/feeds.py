@@ -0,0 +1,209 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост автора раскладывается в ``FeedEntry`` каждому подписчику, и
+страница ``follow_index`` читается одним диапазоном индекса
+``(user, pub_date, post)``. Посты авторов, у которых подписчиков не меньше
+``FOLLOW_FEED_FANOUT_LIMIT``, не раскладываются, а подмешиваются при чтении
+(fan-out on read). Раскладка и донаполнение лент выполняются задачами
+очереди ``core.tasks``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core.tasks import task
+
+from .models import AuthorStats, FeedEntry, Follow, Post
+from .utils import keyset_slice
+
+HOT_AUTHORS_KEY = 'follow-feed:hot-authors'
+HOT_AUTHORS_TIMEOUT = 60
+ENTRY_FIELDS = {'pub_date': 'pub_date', 'pk': 'post'}
+
+
+def followers_count(author_id):
+    return AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+
+
+def hot_authors():
+    """Авторы, чьи посты подмешиваются в ленту при чтении."""
+    authors = cache.get(HOT_AUTHORS_KEY)
+    if authors is None:
+        authors = frozenset(
+            AuthorStats.objects.filter(
+                followers_count__gte=settings.FOLLOW_FEED_FANOUT_LIMIT
+            ).values_list('user', flat=True)
+        )
+        cache.set(HOT_AUTHORS_KEY, authors, HOT_AUTHORS_TIMEOUT)
+    return authors
+
+
+def _bulk_create(entries):
+    FeedEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.FOLLOW_FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+@task
+def fan_out_post(post_id):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'author_id', 'pub_date'
+    ).first()
+    if post is None:
+        return
+    if followers_count(post.author_id) >= settings.FOLLOW_FEED_FANOUT_LIMIT:
+        if post.author_id not in hot_authors():
+            cache.delete(HOT_AUTHORS_KEY)
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_create(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(author_id, user_ids):
+    """Добавляет все посты автора в ленты указанных подписчиков."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    for user_id in user_ids:
+        _bulk_create(
+            FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts.iterator()
+        )
+
+
+@task
+def follow_added(user_id, author_id):
+    # Пока задача ждала очереди, подписку могли отменить.
+    follows = Follow.objects.filter(user_id=user_id, author_id=author_id)
+    if not follows.exists():
+        return
+    total = followers_count(author_id)
+    limit = settings.FOLLOW_FEED_FANOUT_LIMIT
+    if total < limit:
+        backfill(author_id, (user_id,))
+    elif total == limit:
+        cache.delete(HOT_AUTHORS_KEY)
+
+
+def follow_removed(follow):
+    FeedEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id
+    ).delete()
+    if followers_count(follow.author_id) == (
+        settings.FOLLOW_FEED_FANOUT_LIMIT - 1
+    ):
+        author_cooled.delay(follow.author_id)
+
+
+@task
+def author_cooled(author_id):
+    """Доносит посты автора, переставшего быть «горячим», до подписчиков.
+
+    Эти посты публиковались без раскладки; пока лента не донаполнена,
+    автор остаётся в закешированном списке и подмешивается при чтении.
+    """
+    # Пока задача ждала очереди, подписчиков могло снова стать много.
+    if followers_count(author_id) >= settings.FOLLOW_FEED_FANOUT_LIMIT:
+        return
+    backfill(
+        author_id,
+        Follow.objects.filter(author_id=author_id).values_list(
+            'user_id', flat=True
+        )
+    )
+    cache.delete(HOT_AUTHORS_KEY)
+
+
+def rebuild(users=None):
+    """Пересобирает ленты пользователей (или всех) по таблице подписок."""
+    entries = FeedEntry.objects.all()
+    follows = Follow.objects.all()
+    if users is not None:
+        entries = entries.filter(user__in=users)
+        follows = follows.filter(user__in=users)
+    entries.delete()
+    hot = hot_authors()
+    for user_id, author_id in follows.values_list('user_id', 'author_id'):
+        if author_id not in hot:
+            backfill(author_id, (user_id,))
+
+
+class FollowFeed:
+    """Лента подписок пользователя как источник для CursorPaginator.
+
+    Для нумерованных страниц (``?page=``) ведёт себя как обычный QuerySet
+    с JOIN по подпискам.
+    """
+    model = Post
+
+    def __init__(self, user):
+        self.user = user
+
+    def queryset(self):
+        return Post.objects.filter(
+            author__following__user=self.user
+        ).select_related('author', 'group')
+
+    def count(self):
+        return self.queryset().count()
+
+    def __getitem__(self, key):
+        return self.queryset()[key]
+
+    def keyset_slice(self, ordering, values, limit):
+        entries = keyset_slice(
+            FeedEntry.objects.filter(user=self.user).values_list(
+                'post', 'pub_date'
+            ),
+            [
+                '-' * name.startswith('-') + ENTRY_FIELDS[name.lstrip('-')]
+                for name in ordering
+            ],
+            values,
+            limit
+        )
+        hot = Follow.objects.filter(
+            user=self.user, author__in=hot_authors()
+        ).values_list('author', flat=True)
+        if hot:
+            entries += keyset_slice(
+                Post.objects.filter(author__in=list(hot)).values_list(
+                    'pk', 'pub_date'
+                ),
+                ordering,
+                values,
+                limit
+            )
+        keys = sorted(
+            {(pub_date, pk) for pk, pub_date in entries},
+            reverse=ordering[0].startswith('-')
+        )[:limit]
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [pk for pub_date, pk in keys]
+        )
+        return [posts[pk] for pub_date, pk in keys if pk in posts]
+
+
+def follow_feed(user):
+    if settings.FOLLOW_FEED_MATERIALIZED:
+        return FollowFeed(user)
+    return FollowFeed(user).queryset()
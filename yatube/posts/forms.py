@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -16,6 +18,33 @@ class PostForm(ModelForm):
             'group': 'Группа, к которой будет относиться пост'
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.oversized = False
+        if getattr(self.files.get('image'), 'truncated', False):
+            # Обрезанный файл не откроется как картинка, и поле сообщило
+            # бы о битом файле; вместо этого clean_image сообщит о размере.
+            self.files = self.files.copy()
+            del self.files['image']
+            self.oversized = True
+
+    def clean_image(self):
+        if self.oversized:
+            raise uploads.too_large_error()
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return uploads.reencode(image)
+        return image
+
+    def save(self, commit=True):
+        image = self.cleaned_data.get('image')
+        if image is False:
+            self.instance.image_hash = ''
+        digest = getattr(image, 'digest', None)
+        if digest:
+            self.instance.image_hash = digest
+        return super().save(commit)
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,60 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+def measure(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по индексу с прежним сканированием icontains: '
+        'время подсчёта и выборки первой страницы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='+')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        backends = {
+            'index': search.get_backend(),
+            'icontains': search.DatabaseSearchBackend(),
+        }
+        per_page = settings.POSTS_IN_PAGE
+        report = []
+        for query in options['queries']:
+            for name, backend in backends.items():
+                def run():
+                    results = backend.search(query)
+                    return results.count(), list(results[:per_page])
+                total = run()[0]
+                report.append({
+                    'query': query,
+                    'backend': name,
+                    'results': total,
+                    **measure(run, options['repeat']),
+                })
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        for row in report:
+            self.stdout.write(
+                '{query:<20} {backend:<10} {results:>8} '
+                '{median_ms:>10.3f} ms {max_ms:>10.3f} ms'.format(**row)
+            )
@@ -0,0 +1,207 @@
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.queries import QueryRecorder
+from posts import feed_cache
+from posts.models import Group, Post, User
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(int(round(share * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки, число SQL-запросов и выделения памяти для '
+        'страниц posts; результат пишется в JSON и сравнивается с прошлым'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом'
+        )
+        parser.add_argument('--username', help='От чьего имени ходить')
+        parser.add_argument('--output', help='Файл для JSON с результатами')
+        parser.add_argument('--compare', help='JSON прошлого замера')
+        parser.add_argument(
+            '--threshold', type=float, default=10,
+            help='Рост p50 в процентах, который считается регрессией'
+        )
+
+    def subjects(self, username):
+        users = User.objects.annotate(total=Count('follower'))
+        user = (
+            users.filter(username=username).first() if username
+            else users.order_by('-total', 'pk').first()
+        )
+        post = Post.objects.annotate(total=Count('comments')).order_by(
+            '-total', '-pk'
+        ).first()
+        group = Group.objects.annotate(total=Count('posts')).order_by(
+            '-total', 'pk'
+        ).first()
+        if user is None or post is None or group is None:
+            raise CommandError(
+                'Нет данных для замеров, сначала запустите seed_data'
+            )
+        author = Post.objects.values('author__username').annotate(
+            total=Count('pk')
+        ).order_by('-total').first()['author__username']
+        return user, post, group, author
+
+    def scenarios(self, post, group, author):
+        counter = iter(range(10 ** 9))
+        return {
+            'index': lambda client: client.get(reverse('posts:index')),
+            'group_posts': lambda client: client.get(
+                reverse('posts:group_list', args=(group.slug,))
+            ),
+            'profile': lambda client: client.get(
+                reverse('posts:profile', args=(author,))
+            ),
+            'post_detail': lambda client: client.get(
+                reverse('posts:post_detail', args=(post.pk,))
+            ),
+            'follow_index': lambda client: client.get(
+                reverse('posts:follow_index')
+            ),
+            'post_create': lambda client: client.post(
+                reverse('posts:post_create'),
+                {'text': f'Замер {next(counter)}', 'group': group.pk}
+            ),
+            'add_comment': lambda client: client.post(
+                reverse('posts:add_comment', args=(post.pk,)),
+                {'text': f'Замер {next(counter)}'}
+            ),
+        }
+
+    def measure(self, client, run, options):
+        for _ in range(options['warmup']):
+            run(client)
+        timings, queries = [], []
+        for _ in range(options['repeat']):
+            if options['cold']:
+                cache.clear()
+            with QueryRecorder() as recorder:
+                started = time.perf_counter()
+                response = run(client)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f'Ответ {response.status_code}')
+            queries.append(recorder.count)
+        # Выделения меряются отдельным проходом: tracemalloc заметно
+        # замедляет код и исказил бы задержки.
+        tracemalloc.start()
+        try:
+            if options['cold']:
+                cache.clear()
+            run(client)
+            allocated = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p90_ms': round(percentile(timings, 0.9), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': max(queries),
+            'peak_kib': round(allocated / 1024, 1),
+        }
+
+    def compare(self, results, path):
+        with open(path, encoding='utf-8') as stream:
+            baseline = json.load(stream)['views']
+        regressions = 0
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            change = (
+                (current['p50_ms'] - previous['p50_ms'])
+                / previous['p50_ms'] * 100 if previous['p50_ms'] else 0
+            )
+            worse = (
+                change > self.threshold
+                or current['queries'] > previous['queries']
+            )
+            regressions += worse
+            self.stdout.write(
+                f'{name:<14} p50 {previous["p50_ms"]:>8.3f} -> '
+                f'{current["p50_ms"]:>8.3f} ms ({change:+.1f}%)  '
+                f'SQL {previous["queries"]} -> {current["queries"]}'
+                + ('  РЕГРЕССИЯ' if worse else '')
+            )
+        return regressions
+
+    def handle(self, *args, **options):
+        self.threshold = options['threshold']
+        results = {}
+        # Пишущие сценарии откатываются в базе, но не в кеше: фрагменты и
+        # карточки с постами замера сбрасываются общим поколением.
+        try:
+            with transaction.atomic():
+                user, post, group, author = self.subjects(options['username'])
+                client = Client()
+                client.force_login(user)
+                for name, run in self.scenarios(post, group, author).items():
+                    results[name] = self.measure(client, run, options)
+                    self.stdout.write(
+                        '{name:<14} p50 {p50_ms:>8.3f} ms  p90 {p90_ms:>8.3f}'
+                        ' ms  p99 {p99_ms:>8.3f} ms  SQL {queries:>3}  '
+                        '{peak_kib:>8.1f} KiB'.format(
+                            name=name, **results[name]
+                        )
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            feed_cache.bump(feed_cache.GLOBAL)
+        report = {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'repeat': options['repeat'],
+            'cold': options['cold'],
+            'dataset': {
+                'users': User.objects.count(),
+                'groups': Group.objects.count(),
+                'posts': Post.objects.count(),
+            },
+            'views': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+        if options['compare'] and self.compare(results, options['compare']):
+            raise CommandError('Есть регрессии относительно прошлого замера')
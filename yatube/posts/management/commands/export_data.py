@@ -0,0 +1,42 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import bulk
+
+from .import_data import detect_format
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии или подписки в JSONL/CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=bulk.SCHEMAS)
+        parser.add_argument('path', help='Файл или «-» для stdout')
+        parser.add_argument('--format', choices=bulk.FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        fmt = detect_format(path, options['format'])
+        stream = (
+            sys.stdout if path == '-'
+            else open(path, 'w', newline='', encoding='utf-8')
+        )
+        started = reported = time.perf_counter()
+        total = 0
+        try:
+            rows = bulk.export_rows(kind, options['batch_size'])
+            for total in bulk.write(stream, fmt, kind, rows):
+                if time.perf_counter() - reported >= 1:
+                    elapsed = time.perf_counter() - started
+                    self.stderr.write(
+                        f'{kind}: {total} строк, '
+                        f'{total / elapsed:.0f} строк/с'
+                    )
+                    reported = time.perf_counter()
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        self.stderr.write(f'Выгружено строк: {total}')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры для постов, у которых их ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать миниатюры всех постов с картинками'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only(
+            'pk', 'image', 'thumbnails'
+        )
+        done = 0
+        for post in posts.iterator():
+            if options['all'] or not post.thumbnail:
+                thumbnails.generate(post.pk)
+                done += 1
+        self.stdout.write(f'Обработано постов: {done}')
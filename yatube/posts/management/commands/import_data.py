@@ -0,0 +1,72 @@
+import sys
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import bulk
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return 'csv' if path.endswith('.csv') else 'jsonl'
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии или подписки из JSONL/CSV '
+        'пачками через bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=bulk.SCHEMAS)
+        parser.add_argument('path', help='Файл или «-» для stdin')
+        parser.add_argument('--format', choices=bulk.FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать строки, нарушающие уникальность'
+        )
+        parser.add_argument(
+            '--no-refresh', action='store_true',
+            help=(
+                'Не пересобирать ленты, счётчики и поиск (например, если '
+                'дальше грузится ещё один файл)'
+            )
+        )
+
+    def progress(self, kind, total, started):
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        self.stderr.write(f'{kind}: {total} строк, {rate:.0f} строк/с')
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        fmt = detect_format(path, options['format'])
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, newline='', encoding='utf-8')
+        )
+        started = reported = time.perf_counter()
+        total = 0
+        try:
+            for total in bulk.import_rows(
+                kind,
+                bulk.read(stream, fmt),
+                batch_size=options['batch_size'],
+                ignore_conflicts=options['ignore_conflicts'],
+            ):
+                if time.perf_counter() - reported >= 1:
+                    self.progress(kind, total, started)
+                    reported = time.perf_counter()
+        except (IntegrityError, ValidationError, ValueError) as error:
+            raise CommandError(f'Строка ~{total + 1}: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.progress(kind, total, started)
+        if not options['no_refresh']:
+            bulk.refresh((kind,))
+        self.stdout.write(f'Загружено строк: {total}')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько места занимают картинки постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete-orphans', action='store_true',
+            help='Удалить файлы, на которые не ссылается ни один пост'
+        )
+
+    def handle(self, *args, **options):
+        report = media.usage()
+        self.stdout.write(
+            f'Файлов: {report["files"]}, ссылок на них: '
+            f'{report["references"]}\n'
+            f'Занято: {filesizeformat(report["stored"])}, сэкономлено '
+            f'дедупликацией: {filesizeformat(report["saved"])}'
+        )
+        if report['missing']:
+            self.stdout.write(f'Нет на диске: {report["missing"]}')
+        orphans = media.orphans()
+        self.stdout.write(f'Файлов без ссылок: {len(orphans)}')
+        if options['delete_orphans']:
+            deleted = sum(media.release(name) for name in orphans)
+            self.stdout.write(f'Удалено: {deleted}')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+from posts.models import FeedEntry, User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованную ленту подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты пересобрать (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+        feeds.rebuild(users)
+        entries = FeedEntry.objects.all()
+        if users is not None:
+            entries = entries.filter(user__in=users)
+        self.stdout.write(f'Записей в лентах: {entries.count()}')
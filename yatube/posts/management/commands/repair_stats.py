@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписчиков и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько счётчиков разошлось'
+        )
+
+    def handle(self, *args, **options):
+        repaired = counters.repair(
+            batch_size=options['batch_size'], dry_run=options['dry_run']
+        )
+        action = 'Разошлось' if options['dry_run'] else 'Исправлено'
+        self.stdout.write(f'{action} счётчиков: {repaired}')
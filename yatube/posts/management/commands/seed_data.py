@@ -0,0 +1,118 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts import bulk
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетический набор данных для нагрузочных замеров: '
+        'пользователей, группы, посты, комментарии и граф подписок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на пользователя'
+        )
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def load(self, kind, rows):
+        total = 0
+        for total in bulk.import_rows(
+            kind, rows, self.batch_size, ignore_conflicts=True
+        ):
+            pass
+        self.stdout.write(f'{kind}: {total}')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix} уже есть, '
+                f'укажите другой --prefix'
+            )
+        rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        password = make_password(None)
+        User.objects.bulk_create(
+            (
+                User(username=f'{prefix}{number}', password=password)
+                for number in range(options['users'])
+            ),
+            batch_size=self.batch_size
+        )
+        usernames = [f'{prefix}{number}' for number in range(options['users'])]
+        slugs = [f'{prefix}-{number}' for number in range(options['groups'])]
+        self.load('group', (
+            {
+                'title': f'Группа {number}',
+                'slug': slug,
+                'description': f'Описание группы {number}',
+            }
+            for number, slug in enumerate(slugs)
+        ))
+        now = timezone.now()
+
+        def moment():
+            return now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+        # Авторы выбираются неравномерно: несколько «популярных» пишут
+        # заметно больше остальных, как в настоящих лентах.
+        weights = list(accumulate(
+            1 / (rank + 1) for rank in range(len(usernames))
+        ))
+        self.load('post', (
+            {
+                'text': f'Синтетический пост {number} ' + ' '.join(
+                    rng.choice(WORDS) for _ in range(rng.randint(5, 60))
+                ),
+                'pub_date': moment(),
+                'author': rng.choices(usernames, cum_weights=weights)[0],
+                'group': rng.choice(slugs + [None]) if slugs else None,
+            }
+            for number in range(options['posts'])
+        ))
+        post_ids = list(Post.objects.filter(
+            author__username__startswith=prefix
+        ).values_list('pk', flat=True))
+        if post_ids:
+            self.load('comment', (
+                {
+                    'post': rng.choice(post_ids),
+                    'author': rng.choice(usernames),
+                    'text': ' '.join(
+                        rng.choice(WORDS) for _ in range(rng.randint(3, 20))
+                    ),
+                    'created': moment(),
+                }
+                for _ in range(options['comments'])
+            ))
+        follows = min(options['follows'], len(usernames) - 1)
+        self.load('follow', (
+            {'user': user, 'author': author}
+            for user in usernames
+            for author in rng.sample(
+                [name for name in usernames if name != user], follows
+            )
+        ) if follows > 0 else ())
+        bulk.refresh(('post', 'comment', 'follow'))
+
+
+WORDS = (
+    'лето', 'город', 'кошка', 'собака', 'море', 'поезд', 'книга', 'утро',
+    'дождь', 'кофе', 'горы', 'друзья', 'работа', 'музыка', 'фото', 'сад',
+    'дорога', 'вечер', 'снег', 'река', 'небо', 'дом', 'письмо', 'ветер',
+)
@@ -0,0 +1,82 @@
+"""Подсчёт ссылок на файлы картинок постов.
+
+Одинаковые картинки хранятся одним файлом (``core.storage``), поэтому файл
+удаляется, только когда пропадает последний пост, который на него
+ссылается. Ссылки считаются запросом по индексу ``post_image_idx``: сами
+строки постов и есть счётчик, и он не расходится после ``bulk_create``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Post
+
+
+def _addressed(storage, name):
+    is_addressed = getattr(storage, 'is_addressed', None)
+    return is_addressed is not None and is_addressed(name)
+
+
+def _recent(storage, name):
+    try:
+        modified = storage.get_modified_time(name)
+    except (OSError, NotImplementedError):
+        return False
+    return timezone.now() - modified < timedelta(
+        seconds=settings.MEDIA_RELEASE_GRACE
+    )
+
+
+def release(name, storage=default_storage):
+    """Удаляет файл, если на него больше не ссылается ни один пост.
+
+    Файлы со старыми именами не трогает: их могли положить вручную.
+    Файлы моложе ``MEDIA_RELEASE_GRACE`` тоже: такой файл может быть
+    сохранён для поста, транзакция которого ещё не зафиксирована, и
+    ссылки на него пока не видно.
+    """
+    if not _addressed(storage, name):
+        return False
+    if Post.objects.filter(image=name).exists():
+        return False
+    # Возраст проверяется после ссылок: загрузка обновляет время файла
+    # до того, как пост запишется.
+    if _recent(storage, name):
+        return False
+    storage.delete(name)
+    return True
+
+
+def usage(storage=default_storage):
+    """Сколько файлов хранится и сколько места сэкономила дедупликация."""
+    report = {
+        'files': 0, 'references': 0, 'stored': 0, 'saved': 0, 'missing': 0,
+    }
+    rows = Post.objects.exclude(image='').values('image').annotate(
+        references=Count('pk')
+    ).order_by()
+    for row in rows.iterator():
+        try:
+            size = storage.size(row['image'])
+        except (OSError, ValueError):
+            report['missing'] += 1
+            continue
+        report['files'] += 1
+        report['references'] += row['references']
+        report['stored'] += size
+        report['saved'] += size * (row['references'] - 1)
+    return report
+
+
+def orphans(storage=default_storage, directory='posts'):
+    """Файлы хранилища, на которые не ссылается ни один пост."""
+    names = list(storage.addressed_files(directory))
+    referenced = set()
+    for start in range(0, len(names), 500):
+        referenced.update(Post.objects.filter(
+            image__in=names[start:start + 500]
+        ).values_list('image', flat=True))
+    return [name for name in names if name not in referenced]
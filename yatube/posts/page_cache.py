@@ -0,0 +1,58 @@
+"""Кеш готовых страниц лент для анонимных посетителей.
+
+Анонимы видят одинаковый HTML: шапка без имени пользователя, без формы
+комментария. Ключ страницы — её ETag (``posts.conditional.page_etag``),
+в который входят адрес и поколения ``feed_cache``, поэтому правка поста,
+комментария, группы или автора сразу даёт новый ключ, а старые страницы
+вытесняются кешем.
+
+Единственное, что в анонимной странице может зависеть от посетителя, —
+CSRF-токен в формах. Перед записью он заменяется меткой, а при выдаче
+из кеша на её место подставляется токен текущего запроса.
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+PAGE_KEY = 'page:{}'
+CSRF_PLACEHOLDER = '\x00csrf\x00'
+CSRF_VALUE = re.compile(
+    r'(name="csrfmiddlewaretoken" value=")[^"]*(")'
+)
+
+
+def cacheable(request):
+    return (
+        settings.PAGE_CACHE_ENABLED
+        and request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+    )
+
+
+def get(request, etag):
+    if not cacheable(request):
+        return None
+    cached = cache.get(PAGE_KEY.format(etag))
+    if cached is None:
+        return None
+    content_type, content = cached
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+    return HttpResponse(content, content_type=content_type)
+
+
+def store(request, etag, response):
+    if not cacheable(request) or response.status_code != 200 or (
+        response.streaming or response.cookies
+    ):
+        return
+    content = response.content.decode(response.charset)
+    content = CSRF_VALUE.sub(rf'\1{CSRF_PLACEHOLDER}\2', content)
+    cache.set(
+        PAGE_KEY.format(etag),
+        (response['Content-Type'], content),
+        settings.PAGE_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,152 @@
+"""Полнотекстовый поиск по постам.
+
+Бэкенд выбирается настройкой ``POSTS_SEARCH_BACKEND``. По умолчанию это
+инвертированный индекс SQLite FTS5 (таблица ``posts_post_fts``), который
+обновляется сигналами при сохранении и удалении постов. Для других баз
+есть ``DatabaseSearchBackend`` с прежним поиском через ``icontains``.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+TERM = re.compile(r'\w+')
+
+
+def terms(query):
+    return TERM.findall(query)
+
+
+class BaseSearchBackend:
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query):
+        """Посты по запросу в порядке релевантности.
+
+        Возвращает последовательность с ``count()`` и срезами, пригодную
+        для ``Paginator``.
+        """
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        """Ограничивает queryset постами, подходящими под запрос."""
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Поиск сканированием ``Post.text`` через ``icontains``."""
+
+    def filter(self, queryset, query):
+        for term in terms(query):
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+
+    def search(self, query):
+        if not terms(query):
+            return Post.objects.none()
+        return self.filter(
+            Post.objects.select_related('author', 'group'), query
+        )
+
+
+class FTSResults:
+    def __init__(self, backend, match):
+        self.backend = backend
+        self.match = match
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {self.backend.table} '
+                f'WHERE {self.backend.table} MATCH %s',
+                [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        limit = -1 if key.stop is None else max(key.stop - start, 0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.backend.table} '
+                f'WHERE {self.backend.table} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, limit, start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Инвертированный индекс SQLite FTS5 с ранжированием BM25."""
+    table = 'posts_post_fts'
+
+    def match(self, query):
+        # Каждое слово — префиксный поиск, слова объединяются через AND.
+        return ' '.join(f'"{term}"*' for term in terms(query))
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+
+    def search(self, query):
+        match = self.match(query)
+        if not match:
+            return Post.objects.none()
+        return FTSResults(self, match)
+
+    def filter(self, queryset, query):
+        match = self.match(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s',
+            [match]
+        ))
+
+
+@lru_cache(maxsize=None)
+def _backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return _backend(settings.POSTS_SEARCH_BACKEND)
@@ -0,0 +1,141 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, feed_cache, feeds, media, search, thumbnails
+from .models import Comment, Follow, Group, Post, User
+
+
+# Счётчики обновляются первыми: на них опирается раскладка ленты подписок.
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.change(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change(instance.author_id, followers_count=1)
+        counters.change(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.change(instance.author_id, followers_count=-1)
+    counters.change(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and settings.FOLLOW_FEED_MATERIALIZED:
+        feeds.fan_out_post.delay(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and settings.FOLLOW_FEED_MATERIALIZED:
+        feeds.follow_added.delay(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_removed(sender, instance, **kwargs):
+    if settings.FOLLOW_FEED_MATERIALIZED:
+        feeds.follow_removed(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, '')
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    feed_cache.bump(*feed_cache.post_scopes(
+        instance, getattr(instance, '_previous_group_id', None)
+    ))
+
+
+@receiver(post_save, sender=Post)
+def make_thumbnails(sender, instance, raw=False, **kwargs):
+    if not raw and instance.image and not instance.thumbnail:
+        thumbnails.schedule(instance)
+
+
+# Файл картинки удаляется после фиксации транзакции, когда на него
+# не осталось ссылок: при откате он должен остаться на месте.
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_image', '')
+    if not raw and previous and previous != instance.image.name:
+        transaction.on_commit(partial(media.release, previous))
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    if instance.image:
+        transaction.on_commit(partial(media.release, instance.image.name))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    feed_cache.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    # Слаг и название группы попадают в карточки всех лент.
+    feed_cache.bump(feed_cache.GLOBAL)
+
+
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def remember_author_names(sender, instance, raw=False, update_fields=None,
+                          **kwargs):
+    # Обновление last_login при входе на имя не влияет.
+    if instance.pk and not raw and (
+        update_fields is None or set(AUTHOR_FIELDS) & set(update_fields)
+    ):
+        instance._previous_names = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*AUTHOR_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_names', None)
+    if previous is not None and previous != tuple(
+        getattr(instance, field) for field in AUTHOR_FIELDS
+    ):
+        feed_cache.bump(*feed_cache.author_scopes(instance.pk))
+
+
+# Индекс обновляется сразу, а не задачей: это одна вставка в FTS, и без
+# обработчика очереди новые посты иначе не находились бы поиском.
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
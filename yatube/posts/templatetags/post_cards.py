@@ -0,0 +1,13 @@
+from django import template
+
+from posts import feed_cache
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, flag_profile=False, flag_group=False):
+    """Карточки постов из кеша: ``{% post_cards page_obj as cards %}``."""
+    return feed_cache.cards(
+        posts, flag_profile=flag_profile, flag_group=flag_group
+    )
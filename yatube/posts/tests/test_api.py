@@ -0,0 +1,147 @@
+import json
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.queries import QueryBudgetTestMixin
+
+from ..feed_cache import GENERATION_KEY
+from ..models import Comment, Follow, Group, Post, User
+
+
+def content(response):
+    if response.streaming:
+        return json.loads(b''.join(response.streaming_content))
+    return json.loads(response.content)
+
+
+@override_settings(TASKS_EAGER=True)
+class ApiTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for number in range(3):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {number}',
+            )
+        Comment.objects.create(
+            post=cls.post, author=cls.follower, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def test_feeds(self):
+        """Ленты отдают посты в порядке публикации, без лишних запросов."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_list', args=(self.group.slug,)),
+            reverse('api:profile', args=(self.author.username,)),
+            reverse('api:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.follower_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertWithinQueryBudget(response)
+                data = content(response)
+                self.assertEqual(data['results'][0], {
+                    'id': self.post.pk,
+                    'text': self.post.text,
+                    'pub_date': self.post.pub_date.isoformat(),
+                    'author': 'author',
+                    'group': 'test-slug',
+                    'image': None,
+                    'thumbnails': {},
+                })
+                self.assertEqual(len(data['results']), 3)
+
+    def test_cursor_pagination(self):
+        """Страницы листаются по курсору, размер задаёт limit."""
+        url = reverse('api:index')
+        first = content(self.client.get(url, {'limit': 2}))
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNone(first['previous'])
+        second = content(
+            self.client.get(url, {'limit': 2, 'cursor': first['next']})
+        )
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+        response = self.client.get(url, {'cursor': 'мусор'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_not_modified_without_queries(self):
+        """Неизменившаяся лента отвечает 304 без обращения к базе."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_follow_feed_etag(self):
+        """ETag ленты подписок меняется при правке поста на странице."""
+        url = reverse('api:follow_index')
+        etag = self.follower_client.get(url)['ETag']
+        response = self.follower_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        response = self.follower_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            content(response)['results'][0]['text'], 'Исправленный пост'
+        )
+
+    def test_post_detail_and_comments(self):
+        """Пост и его комментарии доступны отдельно."""
+        post = content(self.client.get(
+            reverse('api:post_detail', args=(self.post.pk,))
+        ))
+        self.assertEqual(post['text'], self.post.text)
+        comments = content(self.client.get(
+            reverse('api:post_comments', args=(self.post.pk,))
+        ))
+        self.assertEqual(comments['results'][0]['text'], 'Комментарий')
+        self.assertEqual(comments['results'][0]['author'], 'follower')
+
+    def test_errors(self):
+        """Ошибки отдаются в JSON."""
+        cases = (
+            (self.client.get, reverse('api:follow_index'),
+             HTTPStatus.UNAUTHORIZED),
+            (self.client.get, reverse('api:group_list', args=('nope',)),
+             HTTPStatus.NOT_FOUND),
+            (self.client.get, reverse('api:post_detail', args=(10 ** 6,)),
+             HTTPStatus.NOT_FOUND),
+            (self.client.get, reverse('api:post_comments', args=(10 ** 6,)),
+             HTTPStatus.NOT_FOUND),
+            (self.client.post, reverse('api:index'),
+             HTTPStatus.METHOD_NOT_ALLOWED),
+        )
+        for method, url, status in cases:
+            with self.subTest(url=url, status=status):
+                response = method(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', content(response))
+        # Для несуществующих постов поколения в кеше не заводятся.
+        for scope in (f'post:{10 ** 6}', f'card:{10 ** 6}'):
+            self.assertIsNone(cache.get(GENERATION_KEY.format(scope)))
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import feed_cache
+from ..models import Comment, Follow, Post, User
+
+
+class BenchmarkCommandsTests(TestCase):
+    def test_seed_and_benchmark(self):
+        """seed_data создаёт набор, benchmark_views пишет JSON и откатывает
+        базу и кеш"""
+        call_command(
+            'seed_data', '--users', '5', '--groups', '2', '--posts', '30',
+            '--comments', '20', '--follows', '2', stdout=StringIO()
+        )
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertEqual(Follow.objects.count(), 10)
+        generation = feed_cache.generations()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'result.json')
+            call_command(
+                'benchmark_views', '--repeat', '3', '--warmup', '1',
+                '--output', path, stdout=StringIO()
+            )
+            with open(path, encoding='utf-8') as stream:
+                report = json.load(stream)
+            call_command(
+                'benchmark_views', '--repeat', '3', '--warmup', '1',
+                '--compare', path, '--threshold', '100000', stdout=StringIO()
+            )
+        self.assertEqual(set(report['views']), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create', 'add_comment',
+        })
+        for result in report['views'].values():
+            self.assertGreater(result['queries'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 20)
+        # Фрагменты с откаченными постами замера больше не выдаются.
+        self.assertNotEqual(feed_cache.generations(), generation)
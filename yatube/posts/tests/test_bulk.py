@@ -0,0 +1,111 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from .. import bulk, search
+from ..models import AuthorStats, Comment, FeedEntry, Follow, Group, Post, User
+
+
+class BulkCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def write_jsonl(self, name, rows):
+        with open(self.path(name), 'w', encoding='utf-8') as stream:
+            for row in rows:
+                stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return self.path(name)
+
+    def call(self, *args):
+        call_command(*args, stdout=StringIO(), stderr=StringIO())
+
+    @override_settings(FOLLOW_FEED_MATERIALIZED=True)
+    def test_import_keeps_dates_and_refreshes(self):
+        """Импорт сохраняет даты и пересобирает ленты, счётчики и поиск"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        path = self.write_jsonl('posts.jsonl', (
+            {
+                'id': 100 + number,
+                'text': f'Импортированный пост {number}',
+                'pub_date': f'2020-01-0{number + 1}T10:00:00+00:00',
+                'author': 'author',
+                'group': 'test-slug' if number else None,
+            }
+            for number in range(3)
+        ))
+        self.call('import_data', 'post', path, '--batch-size', '2')
+        post = Post.objects.get(pk=101)
+        self.assertEqual(
+            post.pub_date, datetime(2020, 1, 2, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(post.group, self.group)
+        self.assertIsNone(Post.objects.get(pk=100).group)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 3
+        )
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 3)
+        self.assertEqual(
+            len(search.get_backend().search('импортированный')), 3
+        )
+
+    def test_refresh_skips_unused_follow_feed(self):
+        """Без материализации импорт не заполняет ленту подписок"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Пост')
+        bulk.refresh(('post', 'follow'))
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_round_trip(self):
+        """Выгрузка в CSV и JSONL загружается обратно без потерь"""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост, "в кавычках"'
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        Follow.objects.create(user=self.reader, author=self.author)
+        kinds = ('post', 'comment', 'follow')
+        for fmt in ('csv', 'jsonl'):
+            with self.subTest(fmt=fmt):
+                expected = {}
+                for kind in kinds:
+                    expected[kind] = list(bulk.export_rows(kind))
+                    self.call('export_data', kind, self.path(f'{kind}.{fmt}'))
+                Post.objects.all().delete()
+                Follow.objects.all().delete()
+                for kind in kinds:
+                    self.call('import_data', kind, self.path(f'{kind}.{fmt}'))
+                    self.assertEqual(
+                        list(bulk.export_rows(kind)), expected[kind]
+                    )
+                self.assertEqual(len(expected['comment']), 1)
+
+    def test_unknown_author(self):
+        """Неизвестный автор останавливает импорт понятной ошибкой"""
+        path = self.write_jsonl('posts.jsonl', (
+            {'text': 'Пост', 'author': 'nobody'},
+        ))
+        with self.assertRaisesMessage(CommandError, 'nobody'):
+            self.call('import_data', 'post', path)
+        self.assertFalse(Post.objects.exists())
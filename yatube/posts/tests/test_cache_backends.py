@@ -0,0 +1,155 @@
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache.redis import RedisCache
+from core.cache.resp import RESPError
+from core.cache.server import serve_in_thread
+from core.cache.sqlite import SQLiteCache
+
+
+class CacheContract:
+    """Общие проверки для всех бэкендов кеша."""
+
+    def make_cache(self, **options):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.cache = self.make_cache()
+        self.cache.clear()
+
+    def test_get_set_delete(self):
+        """Значения сохраняются, читаются и удаляются"""
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertTrue(self.cache.has_key('key'))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_many(self):
+        """get_many и set_many работают пачкой"""
+        self.cache.set_many({'a': 1, 'b': 'два', 'c': None})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c', 'd']),
+            {'a': 1, 'b': 'два', 'c': None}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_add_and_incr(self):
+        """add не перезаписывает, incr атомарно увеличивает счётчик"""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 10))
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.get('counter'), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expiry(self):
+        """Просроченные записи не читаются, touch продлевает жизнь"""
+        self.cache.set('short', 1, 0.2)
+        self.cache.set('forever', 1, None)
+        self.cache.set('gone', 1, 0)
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertTrue(self.cache.touch('forever', 60))
+        time.sleep(0.3)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 1)
+        self.assertTrue(self.cache.add('short', 2))
+
+    def test_versioning(self):
+        """Версии ключей не пересекаются, incr_version переносит запись"""
+        self.cache.set('key', 'v1', version=1)
+        self.cache.set('key', 'v2', version=2)
+        self.assertEqual(self.cache.get('key', version=1), 'v1')
+        self.assertEqual(self.cache.get('key', version=2), 'v2')
+        self.cache.incr_version('key', version=2)
+        self.assertIsNone(self.cache.get('key', version=2))
+        self.assertEqual(self.cache.get('key', version=3), 'v2')
+
+    def test_shared_between_instances(self):
+        """Записи видны другому экземпляру, как другому процессу"""
+        other = self.make_cache()
+        self.cache.set('shared', 'значение')
+        self.assertEqual(other.get('shared'), 'значение')
+
+    def test_stats(self):
+        """Попадания и промахи попадают в метрики"""
+        before = self.cache.stats()
+        self.cache.set('key', 1)
+        self.cache.get('key')
+        self.cache.get('missing')
+        after = self.cache.stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+
+
+class SQLiteCacheTests(CacheContract, SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        super().setUp()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_cache(self, **options):
+        return SQLiteCache(
+            os.path.join(self.directory.name, 'cache.sqlite3'),
+            {'OPTIONS': {'STATS_INTERVAL': 0, **options}},
+        )
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читанные записи"""
+        cache = self.make_cache(
+            MAX_ENTRIES=10, CULL_FREQUENCY=2, CULL_INTERVAL=1,
+            LRU_RESOLUTION=0,
+        )
+        for number in range(10):
+            cache.set(f'key{number}', number)
+        cache.get('key0')
+        cache.set('key10', 10)
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertIsNone(cache.get('key1'))
+        self.assertLessEqual(cache.stats()['entries'], 10)
+        self.assertGreater(cache.stats()['evictions'], 0)
+
+
+class RedisCacheTests(CacheContract, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = serve_in_thread()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def make_cache(self, **options):
+        host, port = self.server.server_address
+        return RedisCache(f'redis://{host}:{port}/1', {'OPTIONS': options})
+
+    def test_databases_are_separate(self):
+        """Разные номера баз не видят записей друг друга"""
+        host, port = self.server.server_address
+        other = RedisCache(f'redis://{host}:{port}/2', {})
+        self.cache.set('key', 1)
+        self.assertIsNone(other.get('key'))
+
+    def test_server_eviction(self):
+        """Замена Redis вытесняет записи по своей политике"""
+        server = serve_in_thread(max_entries=2, eviction='noeviction')
+        host, port = server.server_address
+        cache = RedisCache(f'redis://{host}:{port}/0', {})
+        try:
+            cache.set('a', 1)
+            cache.set('b', 2)
+            with self.assertRaises(RESPError):
+                cache.set('c', 3)
+        finally:
+            server.shutdown()
+            server.server_close()
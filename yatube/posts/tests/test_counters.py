@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Follow, Post, User
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами и подписками"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.follower).following_count, 1)
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.follower).following_count, 0)
+
+    def test_cascade_delete(self):
+        """Удаление пользователя уменьшает счётчики его авторов"""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        reader.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_profile_uses_counters(self):
+        """Профиль берёт числа из счётчиков, а не из COUNT(*)"""
+        Post.objects.create(author=self.author, text='Пост')
+        url = reverse('posts:profile', args=(self.author.username,))
+        self.client.get(url)
+        # Первый запрос — id автора для ETag страницы.
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(response.context['count'], 1)
+
+    def test_repair_stats(self):
+        """Команда repair_stats исправляет дрейф после bulk_create"""
+        Post.objects.create(author=self.author, text='Пост')
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(3)
+        )
+        AuthorStats.objects.create(user=self.follower, following_count=7)
+        call_command('repair_stats', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 4)
+        self.assertEqual(self.stats(self.follower).following_count, 0)
@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Task
+from core.tasks import execute
+
+from ..feeds import HOT_AUTHORS_KEY
+from ..models import FeedEntry, Follow, Post, User
+
+
+@override_settings(TASKS_EAGER=True, FOLLOW_FEED_MATERIALIZED=True)
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.other = User.objects.create_user(username='other')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки'
+        )
+
+    def setUp(self):
+        cache.delete(HOT_AUTHORS_KEY)
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_clears(self):
+        """Подписка добавляет старые посты, отписка убирает их из ленты"""
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(self.feed(), [self.old_post])
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.follower))
+        self.assertEqual(self.feed(), [])
+
+    def test_new_post_fan_out(self):
+        """Новый пост раскладывается по лентам подписчиков"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.follower, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(FOLLOW_FEED_FANOUT_LIMIT=2)
+    def test_hot_author_fan_out_on_read(self):
+        """Посты популярного автора подмешиваются в ленту при чтении"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        follow = Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+        follow.delete()
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.follower, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(FOLLOW_FEED_FANOUT_LIMIT=2)
+    def test_unfollow_backfill_deferred(self):
+        """Донаполнение лент после отписки идёт задачей, а не в запросе"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        follow = Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.feed(), [post, self.old_post])
+        with self.settings(TASKS_EAGER=False):
+            follow.delete()
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'posts.feeds.author_cooled')
+        self.assertEqual(self.feed(), [post, self.old_post])
+        execute(task)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.follower, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(FOLLOW_FEED_MATERIALIZED=False)
+    def test_feed_without_materialization(self):
+        """Без материализации лента строится запросом по подпискам"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed(), [self.old_post])
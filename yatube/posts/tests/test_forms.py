@@ -1,9 +1,13 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO, StringIO
+
+from PIL import Image
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
@@ -12,6 +16,11 @@ from ..models import Comment, Group, Post, User
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
+def hashed_name(post, extension):
+    digest = post.image_hash
+    return f'posts/{digest[:2]}/{digest[2:4]}/{digest}.{extension}'
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostsFormsTests(TestCase):
     @classmethod
@@ -89,7 +98,7 @@ class PostsFormsTests(TestCase):
             Post.objects.filter(
                 group=form_data['group'],
                 text=form_data['text'],
-                image='posts/small.gif'
+                image=hashed_name(post, 'gif')
             ).exists()
         )
 
@@ -142,10 +151,127 @@ class PostsFormsTests(TestCase):
             Post.objects.filter(
                 group=form_data['group'],
                 text=form_data['text'],
-                image='posts/picture.jpg'
+                image=hashed_name(post, 'gif')
             ).exists()
         )
 
+    def test_create_post_thumbnails(self):
+        """После обработки очереди готовы миниатюры всех размеров."""
+        buffer = BytesIO()
+        Image.new('RGB', (2000, 1000), 'red').save(buffer, 'PNG')
+        uploaded = SimpleUploadedFile(
+            name='big.png',
+            content=buffer.getvalue(),
+            content_type='image/png'
+        )
+        self.auth_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded},
+        )
+        call_command('run_tasks', '--once', '--threads', '1',
+                     stdout=StringIO())
+        post = Post.objects.get(text='Пост с картинкой')
+        for alias, options in settings.THUMBNAIL_ALIASES.items():
+            with self.subTest(alias=alias):
+                width, height = map(int, options['geometry'].split('x'))
+                self.assertEqual(post.thumbnail[alias]['width'], width)
+                self.assertEqual(post.thumbnail[alias]['height'], height)
+        response = self.auth_client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, post.thumbnail['detail']['url'])
+
+    def test_create_post_reencodes_image(self):
+        """Картинка уменьшается и пересохраняется без метаданных."""
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Камера'
+        Image.new('RGB', (4000, 1000), 'blue').save(
+            buffer, 'JPEG', exif=exif.tobytes()
+        )
+        uploaded = SimpleUploadedFile(
+            name='photo.jpeg',
+            content=buffer.getvalue(),
+            content_type='image/jpeg'
+        )
+        self.auth_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Большое фото', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Большое фото')
+        self.assertEqual(post.image.name, hashed_name(post, 'jpg'))
+        self.assertEqual(len(post.image_hash), 64)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(max(image.size), settings.IMAGE_MAX_DIMENSION)
+            self.assertFalse(image.getexif())
+
+    def test_same_image_shares_file(self):
+        """Одинаковые картинки разных постов хранятся одним файлом."""
+        buffer = BytesIO()
+        Image.new('RGB', (20, 20), 'green').save(buffer, 'PNG')
+        for text in ('Первый', 'Второй'):
+            self.auth_client.post(
+                reverse('posts:post_create'),
+                data={'text': text, 'image': SimpleUploadedFile(
+                    name=f'{text}.png',
+                    content=buffer.getvalue(),
+                    content_type='image/png'
+                )},
+            )
+        first = Post.objects.get(text='Первый')
+        second = Post.objects.get(text='Второй')
+        self.assertEqual(first.image_hash, second.image_hash)
+        self.assertEqual(first.image.name, second.image.name)
+
+    @override_settings(UPLOAD_MAX_SIZE=1024)
+    def test_create_post_rejects_large_and_broken_files(self):
+        """Слишком большой файл и не картинка не принимаются."""
+        buffer = BytesIO()
+        Image.effect_noise((200, 200), 50).save(buffer, 'PNG')
+        files = {
+            'image': buffer.getvalue(),
+            'text': 'просто текст'.encode() * 10,
+        }
+        for name, content in files.items():
+            with self.subTest(name=name):
+                response = self.auth_client.post(
+                    reverse('posts:post_create'),
+                    data={'text': name, 'image': SimpleUploadedFile(
+                        name=f'{name}.png', content=content
+                    )},
+                )
+                self.assertFalse(Post.objects.filter(text=name).exists())
+                self.assertTrue(response.context['form'].errors['image'])
+
+    @override_settings(
+        IMAGE_UPLOAD_MAX_FRAMES=20, IMAGE_UPLOAD_MAX_PIXELS=20000
+    )
+    def test_create_post_rejects_heavy_animation(self):
+        """Анимация ограничена числом кадров и пикселями всех кадров."""
+        cases = {
+            'frames': (200, (10, 10)),
+            'pixels': (10, (50, 50)),
+        }
+        for code, (count, size) in cases.items():
+            with self.subTest(code=code):
+                frames = [Image.new('P', size, index % 2)
+                          for index in range(count)]
+                buffer = BytesIO()
+                frames[0].save(
+                    buffer, 'GIF', save_all=True, append_images=frames[1:]
+                )
+                response = self.auth_client.post(
+                    reverse('posts:post_create'),
+                    data={'text': code, 'image': SimpleUploadedFile(
+                        name='animation.gif', content=buffer.getvalue()
+                    )},
+                )
+                self.assertFalse(Post.objects.filter(text=code).exists())
+                self.assertEqual(
+                    response.context['form'].errors.as_data()['image'][0]
+                    .code, code
+                )
+
     def test_guest_create_post(self):
         """Проверка что неавторизованный юзер
             не сможет создать пост."""
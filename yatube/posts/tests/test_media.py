@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.storage import ContentAddressedStorage
+
+from .. import media
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+# Миниатюры для поддельных картинок не нужны: задачи остаются в очереди.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_EAGER=False)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_same_content_same_name(self):
+        """Одинаковые байты сохраняются один раз под именем-хешем."""
+        storage = ContentAddressedStorage()
+        first = storage.save('posts/a.gif', ContentFile(b'GIF89a-1'))
+        second = storage.save('posts/b.GIF', ContentFile(b'GIF89a-1'))
+        other = storage.save('posts/a.gif', ContentFile(b'GIF89a-2'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertRegex(
+            first, r'^posts/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.gif$'
+        )
+        self.assertTrue(storage.is_addressed(first))
+        self.assertFalse(storage.is_addressed('posts/a.gif'))
+        self.assertCountEqual(
+            storage.addressed_files('posts'), [first, other]
+        )
+
+    def test_usage_and_orphans(self):
+        """Отчёт считает сэкономленное место и файлы без ссылок."""
+        user = User.objects.create_user(username='author')
+        name = default_storage.save('posts/a.gif', ContentFile(b'x' * 100))
+        orphan = default_storage.save('posts/b.gif', ContentFile(b'y'))
+        for text in ('первый', 'второй', 'третий'):
+            Post.objects.create(author=user, text=text, image=name)
+        report = media.usage()
+        self.assertEqual(report['files'], 1)
+        self.assertEqual(report['references'], 3)
+        self.assertEqual(report['stored'], 100)
+        self.assertEqual(report['saved'], 200)
+        orphans = media.orphans()
+        self.assertIn(orphan, orphans)
+        self.assertNotIn(name, orphans)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_EAGER=False)
+class ReleaseImageTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @override_settings(MEDIA_RELEASE_GRACE=0)
+    def test_file_deleted_with_last_reference(self):
+        """Файл удаляется вместе с последним ссылающимся постом."""
+        user = User.objects.create_user(username='author')
+        name = default_storage.save('posts/c.gif', ContentFile(b'shared'))
+        first = Post.objects.create(author=user, text='первый', image=name)
+        second = Post.objects.create(author=user, text='второй', image=name)
+        first.delete()
+        self.assertTrue(default_storage.exists(name))
+        second.image = ''
+        second.save()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_reused_file_survives_release(self):
+        """Файл, заново сохранённый для ещё не записанного поста, не
+        удаляется освобождением прежней ссылки."""
+        user = User.objects.create_user(username='author')
+        name = default_storage.save('posts/d.gif', ContentFile(b'reused'))
+        path = default_storage.path(name)
+        # Картинка давно удалённого поста.
+        os.utime(path, (0, 0))
+        # Та же картинка загружена снова, а пост ещё не записан, когда
+        # освобождение старой ссылки не находит ни одного поста.
+        self.assertEqual(
+            default_storage.save('posts/e.gif', ContentFile(b'reused')), name
+        )
+        self.assertFalse(media.release(name))
+        post = Post.objects.create(author=user, text='новый', image=name)
+        self.assertTrue(default_storage.exists(post.image.name))
+        post.delete()
+        self.assertTrue(default_storage.exists(name))
+        os.utime(path, (0, 0))
+        self.assertTrue(media.release(name))
+        self.assertFalse(default_storage.exists(name))
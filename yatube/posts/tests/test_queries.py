@@ -0,0 +1,196 @@
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.queries import QueryBudgetTestMixin, QueryRecorder
+
+from ..models import Comment, Follow, Group, Post, User
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?posts_\w+$')
+SORT = 'USE TEMP B-TREE FOR ORDER BY'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@override_settings(TASKS_EAGER=True, FOLLOW_FEED_MATERIALIZED=True)
+class FeedIndexesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for number in range(settings.THIRTEEN):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {number}',
+            )
+        Comment.objects.create(
+            post=cls.post, author=cls.follower, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def feed_plans(self, address, args=None):
+        """Планы запросов к таблицам posts на первой и второй странице."""
+        url = reverse(address, args=args)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            page_obj = response.context.get('page_obj')
+            if page_obj is not None:
+                cursor = page_obj.keyset.next_cursor
+                self.client.get(url, {'cursor': cursor})
+        return [
+            (query['sql'], query_plan(query['sql']))
+            for query in queries.captured_queries
+            if '"posts_' in query['sql']
+        ]
+
+    def test_feeds_use_indexes(self):
+        """Ленты читаются по индексу без полного скана и сортировки"""
+        feeds = (
+            ('posts:index', None),
+            ('posts:group_list', (self.group.slug,)),
+            ('posts:profile', (self.author.username,)),
+            ('posts:post_detail', (self.post.id,)),
+        )
+        for address, args in feeds:
+            with self.subTest(address=address):
+                for sql, plan in self.feed_plans(address, args):
+                    self.assertFalse(
+                        any(FULL_SCAN.match(step) for step in plan),
+                        f'{sql}\n{plan}'
+                    )
+                    self.assertNotIn(SORT, plan, f'{sql}\n{plan}')
+
+    def test_follow_feed_uses_indexes(self):
+        """Лента подписок читается диапазоном индекса без сортировки"""
+        plans = self.feed_plans('posts:follow_index')
+        self.assertTrue(plans)
+        for sql, plan in plans:
+            self.assertFalse(
+                any(FULL_SCAN.match(step) for step in plan),
+                f'{sql}\n{plan}'
+            )
+            self.assertNotIn(SORT, plan, f'{sql}\n{plan}')
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+        for number in range(settings.THIRTEEN):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                group=(cls.group, cls.other_group, None)[number % 3],
+                text=f'Тестовый пост {number}',
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.follower, text='Комментарий'
+            )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def test_views_within_budget(self):
+        """Страницы укладываются в бюджет запросов и не делают N+1"""
+        pages = (
+            ('posts:index', None),
+            ('posts:group_list', (self.group.slug,)),
+            ('posts:profile', (self.author.username,)),
+            ('posts:post_detail', (self.post.id,)),
+            ('posts:follow_index', None),
+            ('posts:search', None),
+        )
+        for address, args in pages:
+            for page in (1, 2):
+                with self.subTest(address=address, page=page):
+                    cache.clear()
+                    response = self.client.get(
+                        reverse(address, args=args),
+                        {'q': 'пост', 'page': page}
+                    )
+                    self.assertWithinQueryBudget(response)
+
+    def test_write_views_within_budget(self):
+        """Создание и правка поста укладываются в бюджет запросов"""
+        self.client.force_login(self.author)
+        create = reverse('posts:post_create')
+        edit = reverse('posts:post_edit', args=(self.post.id,))
+        image = SimpleUploadedFile(
+            'small.gif', SMALL_GIF, content_type='image/gif'
+        )
+        requests = (
+            ('get', create, None),
+            ('post', create, {
+                'text': 'Новый пост', 'group': self.group.id, 'image': image,
+            }),
+            ('get', edit, None),
+            ('post', edit, {'text': 'Правка', 'group': self.group.id}),
+        )
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        for method, url, data in requests:
+            with self.subTest(method=method, url=url), self.settings(
+                MEDIA_ROOT=media_root.name
+            ):
+                cache.clear()
+                response = getattr(self.client, method)(url, data)
+                self.assertWithinQueryBudget(response)
+
+    def test_repeated_queries_detected(self):
+        """Обращение к связанным объектам в цикле считается повтором"""
+        with QueryRecorder() as recorder:
+            for post in Post.objects.all():
+                post.group
+        self.assertEqual(len(recorder.repeated()), 1)
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 1})
+    def test_over_budget_logged(self):
+        """Превышение бюджета попадает в лог"""
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
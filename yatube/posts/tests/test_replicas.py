@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.db import (
+    ReplicaMiddleware, reading_replica, replica_reads, use_replica,
+)
+
+from .. import conditional, feed_cache
+from ..models import Post, User
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTest(SimpleTestCase):
+    def test_router(self):
+        """С реплики читаются только модели постов и только по запросу."""
+        self.assertEqual(router.db_for_read(Post), 'default')
+        with use_replica():
+            self.assertEqual(router.db_for_read(Post), 'replica1')
+            self.assertEqual(router.db_for_read(User), 'default')
+            post = Post()
+            post._state.db = 'replica1'
+            self.assertEqual(
+                router.db_for_write(Post, instance=post), 'default'
+            )
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+
+    def test_middleware(self):
+        """Помеченные представления читают с реплики, кроме окна после
+        записи."""
+        seen = []
+
+        @replica_reads
+        def read_view(request):
+            seen.append(reading_replica())
+            return HttpResponse()
+
+        def write_view(request):
+            seen.append(reading_replica())
+            return HttpResponse()
+
+        factory = RequestFactory()
+        sticky = factory.get('/')
+        sticky.COOKIES['primary'] = '1'
+        cases = (
+            (factory.get('/'), read_view, True),
+            (factory.get('/'), write_view, False),
+            (factory.post('/'), read_view, False),
+            (sticky, read_view, False),
+        )
+        for request, view, expected in cases:
+            with self.subTest(
+                method=request.method, view=view.__name__,
+                cookies=request.COOKIES
+            ):
+                middleware = ReplicaMiddleware(view)
+
+                def get_response(request):
+                    middleware.process_view(request, view, (), {})
+                    return view(request)
+                middleware.get_response = get_response
+                response = middleware(request)
+                self.assertEqual(seen[-1], expected)
+                self.assertFalse(reading_replica())
+                self.assertEqual(
+                    'primary' in response.cookies, request.method == 'POST'
+                )
+
+    def test_recent_changes_read_from_primary(self):
+        """Области, изменённые за окно отставания реплики, читаются с
+        основной базы."""
+        cache.clear()
+        with use_replica():
+            conditional.generations('index')
+            self.assertTrue(reading_replica())
+            feed_cache.bump('group:1')
+            conditional.generations('index')
+            self.assertTrue(reading_replica())
+            conditional.generations('group:1')
+            self.assertFalse(reading_replica())
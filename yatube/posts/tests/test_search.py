@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Post, User
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Кошки спят. Кошки едят. Кошки гуляют.'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собаки и одна кошка'
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def found(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_ranking(self):
+        """Поиск без учёта регистра, по префиксу и с ранжированием"""
+        self.assertEqual(self.found('КОШК'), [self.cats, self.dogs])
+        self.assertEqual(self.found('собаки кошка'), [self.dogs])
+        self.assertEqual(self.found(''), [])
+
+    def test_index_follows_writes(self):
+        """Индекс обновляется при изменении и удалении поста"""
+        post = Post.objects.create(author=self.user, text='Черепаха')
+        self.assertEqual(self.found('черепаха'), [post])
+        post.text = 'Ёжик'
+        post.save()
+        self.assertEqual(self.found('черепаха'), [])
+        self.assertEqual(self.found('ёжик'), [post])
+        post.delete()
+        self.assertEqual(self.found('ёжик'), [])
+
+    def test_search_pagination_keeps_query(self):
+        """Ссылки пагинатора сохраняют поисковый запрос"""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Попугай {number}')
+            for number in range(settings.THIRTEEN)
+        )
+        search.get_backend().rebuild()
+        response = self.client.get(reverse('posts:search'), {'q': 'попугай'})
+        self.assertEqual(
+            len(response.context['page_obj']), settings.POSTS_IN_PAGE
+        )
+        self.assertContains(response, '?q=%D0%BF%D0%BE%D0%BF%D1%83%D0%B3')
+
+    def test_admin_search(self):
+        """Поиск в админке идёт через поисковый бэкенд"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'}
+        )
+        self.assertEqual(list(response.context['cl'].result_list), [self.dogs])
+
+    @override_settings(
+        POSTS_SEARCH_BACKEND='posts.search.DatabaseSearchBackend'
+    )
+    def test_database_backend(self):
+        """Запасной бэкенд ищет через icontains"""
+        self.assertEqual(self.found('Собак'), [self.dogs])
@@ -0,0 +1,106 @@
+import gzip
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from core.staticfiles import compress
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+STYLE = b'body { color: black; }\n' * 100
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, STATIC_ROOT=TEMP_STATIC_ROOT)
+class ServingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.name = default_storage.save(
+            'posts/file.txt', ContentFile(b'0123456789')
+        )
+        cls.url = settings.MEDIA_URL + cls.name
+        os.makedirs(os.path.join(TEMP_STATIC_ROOT, 'css'))
+        cls.style = os.path.join(TEMP_STATIC_ROOT, 'css', 'app.css')
+        with open(cls.style, 'wb') as file:
+            file.write(STYLE)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def test_validators_and_not_modified(self):
+        """Ответ несёт ETag и Last-Modified, повторный запрос получает 304."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertIn('immutable', response['Cache-Control'])
+        for header, value in (
+            ('HTTP_IF_NONE_MATCH', response['ETag']),
+            ('HTTP_IF_MODIFIED_SINCE', response['Last-Modified']),
+        ):
+            with self.subTest(header=header):
+                cached = self.client.get(self.url, **{header: value})
+                self.assertEqual(
+                    cached.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_range(self):
+        """Запрос диапазона отдаёт часть файла, невыполнимый — 416."""
+        cases = {
+            'bytes=2-5': (HTTPStatus.PARTIAL_CONTENT, b'2345', 'bytes 2-5/10'),
+            'bytes=-3': (HTTPStatus.PARTIAL_CONTENT, b'789', 'bytes 7-9/10'),
+            'bytes=20-': (
+                HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, b'', 'bytes */10'
+            ),
+        }
+        for header, (status, body, content_range) in cases.items():
+            with self.subTest(range=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, status)
+                content = (
+                    b''.join(response.streaming_content)
+                    if response.streaming else response.content
+                )
+                self.assertEqual(content, body)
+                self.assertEqual(response['Content-Range'], content_range)
+
+    def test_stale_if_range_returns_whole_file(self):
+        """Если файл изменился, If-Range приводит к полному ответу."""
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_precompressed_variant(self):
+        """Сжатая копия отдаётся клиенту, который её принимает."""
+        self.assertIn(self.style + '.gz', compress(self.style))
+        url = settings.STATIC_URL + 'css/app.css'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), STYLE
+        )
+        self.assertIn('must-revalidate', response['Cache-Control'])
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(plain.streaming_content), STYLE)
+
+    def test_missing_and_outside_paths(self):
+        """Несуществующие файлы и пути за пределами каталога — 404."""
+        for url in (
+            settings.MEDIA_URL + 'posts/missing.txt',
+            settings.MEDIA_URL + '../settings.py',
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
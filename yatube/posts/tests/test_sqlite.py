@@ -0,0 +1,75 @@
+import json
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import SimpleTestCase
+
+
+class TunedSQLiteTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+        connections.databases['tuned'] = {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': self.path,
+            'OPTIONS': {
+                'pragmas': settings.SQLITE_PRAGMAS,
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+        self.addCleanup(connections.databases.pop, 'tuned')
+        self.connection = connections['tuned']
+        self.addCleanup(connections.__delitem__, 'tuned')
+        self.addCleanup(self.connection.close)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """PRAGMA из OPTIONS выполняются на новом соединении."""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(
+            self.pragma('mmap_size'), settings.SQLITE_PRAGMAS['mmap_size']
+        )
+
+    def test_immediate_transaction(self):
+        """atomic сразу берёт блокировку на запись, а читать не мешает."""
+        with self.connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        with transaction.atomic(using='tuned'):
+            self.assertTrue(self.connection.in_atomic_block)
+            with self.assertRaisesMessage(
+                sqlite3.OperationalError, 'locked'
+            ):
+                other.execute('BEGIN IMMEDIATE')
+            self.assertEqual(
+                other.execute('SELECT COUNT(*) FROM item').fetchone(), (0,)
+            )
+
+
+class BenchmarkSQLiteTest(SimpleTestCase):
+    def test_report(self):
+        """benchmark_sqlite сравнивает оба режима на временных базах."""
+        out = StringIO()
+        call_command(
+            'benchmark_sqlite', '--seconds', '0.2', '--readers', '2',
+            '--writers', '1', '--json', stdout=out
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report), {'default', 'tuned'})
+        self.assertEqual(report['tuned']['writes']['errors'], 0)
+        for result in report.values():
+            self.assertGreater(result['reads']['per_second'], 0)
+            self.assertGreater(result['writes']['per_second'], 0)
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+from .. import search
+from ..models import FeedEntry, Follow, Post, User
+
+CALLS = []
+
+
+@tasks.task(max_attempts=2, retry_delay=60)
+def flaky(value):
+    CALLS.append(value)
+    raise RuntimeError('Сбой')
+
+
+@tasks.task
+def remember(value):
+    CALLS.append(value)
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+
+    def setUp(self):
+        CALLS.clear()
+
+    def run_tasks(self):
+        call_command('run_tasks', '--once', '--threads', '1',
+                     stdout=StringIO())
+
+    @override_settings(FOLLOW_FEED_MATERIALIZED=True)
+    def test_post_side_effects_deferred(self):
+        """Раскладка поста выполняется обработчиком, индексация — сразу"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.run_tasks()
+        Post.objects.create(author=self.author, text='Отложенный пост')
+        self.assertEqual(
+            set(Task.objects.values_list('name', flat=True)),
+            {'posts.feeds.fan_out_post'}
+        )
+        self.assertEqual(len(search.get_backend().search('отложенный')), 1)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.run_tasks()
+        self.assertEqual(FeedEntry.objects.filter(user=self.follower).count(),
+                         1)
+        self.assertFalse(Task.objects.exists())
+
+    def test_cancelled_follow_not_backfilled(self):
+        """Отменённая до выполнения задачи подписка не наполняет ленту"""
+        Post.objects.create(author=self.author, text='Пост')
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        follow.delete()
+        self.run_tasks()
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_retries(self):
+        """Упавшая задача повторяется с паузой, затем помечается failed"""
+        flaky.delay(1)
+        self.run_tasks()
+        item = Task.objects.get()
+        self.assertEqual(
+            (item.status, item.attempts), (Task.QUEUED, 1)
+        )
+        self.assertIn('Сбой', item.last_error)
+        self.assertGreater(item.run_at, timezone.now())
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.run_tasks()
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.attempts), (Task.FAILED, 2))
+        self.assertEqual(CALLS, [1, 1])
+
+    def test_claim_is_exclusive(self):
+        """Взятая задача не достаётся второму обработчику"""
+        remember.delay(1)
+        self.assertEqual(len(tasks.claim(10, worker='first')), 1)
+        self.assertEqual(tasks.claim(10, worker='second'), [])
+
+    @override_settings(TASKS_LOCK_TIMEOUT=60)
+    def test_stale_tasks_requeued(self):
+        """Задачи зависшего обработчика возвращаются в очередь"""
+        remember.delay(2)
+        tasks.claim(10, worker='lost')
+        Task.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.run_tasks()
+        self.assertEqual(CALLS, [2])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode(self):
+        """В тестовом режиме задачи выполняются сразу и не падают наружу"""
+        remember.delay(3)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            flaky.delay(4)
+        self.assertEqual(CALLS, [3, 4])
+        self.assertFalse(Task.objects.exists())
@@ -0,0 +1,49 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import engines
+from django.test import TestCase, override_settings
+
+from core.templates import configure, warm_up
+
+from ..models import Group, Post, User
+
+
+class CachedTemplatesTests(TestCase):
+    @override_settings(TEMPLATES=configure(cached=True))
+    def test_warm_up(self):
+        """Прогрев заранее кладёт шаблоны и их include в кеш загрузчика"""
+        self.assertGreater(warm_up(), 0)
+        loader = engines['django'].engine.template_loaders[0]
+        cached = {key.split('-')[0] for key in loader.get_template_cache}
+        for name in (
+            'posts/index.html',
+            'posts/includes/card_post.html',
+            'posts/includes/paginator.html',
+            'posts/includes/switcher.html',
+            'posts/includes/comments.html',
+        ):
+            with self.subTest(name=name):
+                self.assertIn(name, cached)
+
+    @override_settings(TEMPLATES=configure(cached=False))
+    def test_warm_up_without_cache(self):
+        """Без кеширующего загрузчика прогревать нечего"""
+        self.assertEqual(warm_up(), 0)
+
+    def test_benchmark_templates(self):
+        """benchmark_templates сравнивает оба режима по страницам"""
+        user = User.objects.create_user(username='author')
+        group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        Post.objects.create(author=user, group=group, text='Тестовый пост')
+        out = StringIO()
+        call_command('benchmark_templates', '--repeat', '2', '--json',
+                     stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertIn('index', report)
+        self.assertEqual(
+            set(report['index']), {'uncached', 'cached', 'speedup'}
+        )
@@ -1,17 +1,24 @@
 from django import forms
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from .. import feed_cache, page_cache
 from ..forms import PostForm
-from ..models import Follow, Group, Post, User
+from ..models import Comment, Follow, Group, Post, User
+from ..utils import ElidedPaginator
 
 TEST_POST_TEXT = 'Тестовый пост №13 тестового пользователя в тестовой группе'
 ZERO = 0
 ONE = 1
 
 
+@override_settings(TASKS_EAGER=True)
 class PostsViewsTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -88,6 +95,35 @@ class PostsViewsTests(TestCase):
         )
         self.function_check(response, True)
 
+    @override_settings(COMMENTS_FIRST_PAGE=2, COMMENTS_PER_PAGE=2)
+    def test_post_detail_comments_pages(self):
+        """Комментарии отдаются порциями и догружаются фрагментами"""
+        cache.clear()
+        comments = [
+            Comment.objects.create(
+                post=self.post, author=self.user, text=f'Комментарий {i}'
+            )
+            for i in range(5)
+        ]
+        response = self.auth_client.get(
+            reverse('posts:post_detail', args=(self.post.id,))
+        )
+        page = response.context['comments']
+        self.assertEqual(list(page), comments[:2])
+        seen = list(page)
+        while page.keyset.has_next():
+            response = self.auth_client.get(
+                reverse('posts:post_comments', args=(self.post.id,)),
+                {'cursor': page.keyset.next_cursor}
+            )
+            self.assertTemplateUsed(
+                response, 'posts/includes/comments_page.html'
+            )
+            self.assertTemplateNotUsed(response, 'base.html')
+            page = response.context['comments']
+            seen.extend(page)
+        self.assertEqual(seen, comments)
+
     def test_post_create_and_edit_show_correct_context(self):
         """Шаблон create_post (create) and (edit) сформирован
         с правильным контекстом."""
@@ -140,15 +176,126 @@ class PostsViewsTests(TestCase):
         self.assertEqual(len(response2.context['page_obj']), post_count + ONE)
 
     def test_cache_index(self):
-        """Проверяем что главная отдает кэшированные данные."""
+        """Главная отдает кэшированные данные, пока посты не изменились."""
+        cache.clear()
         response_1 = self.auth_client.get(reverse('posts:index'))
-        Post.objects.all().delete()
+        Post.objects.update(text='Текст, измененный в обход сигналов')
         response_2 = self.auth_client.get(reverse('posts:index'))
         self.assertTrue(response_1.content == response_2.content)
-        cache.clear()
+        Post.objects.all().delete()
         response_3 = self.auth_client.get(reverse('posts:index'))
         self.assertTrue(response_1.content != response_3.content)
 
+    def test_cache_invalidation(self):
+        """Изменение поста и комментарии сбрасывают кэш своих лент."""
+        cache.clear()
+        urls = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            self.auth_client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактированный текст'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.auth_client.get(url)
+                self.assertContains(response, 'Отредактированный текст')
+        detail = reverse('posts:post_detail', args=(self.post.id,))
+        self.auth_client.get(detail)
+        self.auth_client.post(
+            reverse('posts:add_comment', args=(self.post.id,)),
+            {'text': 'Новый комментарий'}
+        )
+        self.assertContains(self.auth_client.get(detail), 'Новый комментарий')
+
+    def test_post_cards_cached(self):
+        """Пересобранная лента берёт карточки из кэша, правка их сбрасывает."""
+        cache.clear()
+        url = reverse('posts:index')
+        self.auth_client.get(url)
+        Post.objects.update(text='Текст, измененный в обход сигналов')
+        feed_cache.bump('index')
+        response = self.auth_client.get(url)
+        self.assertContains(response, TEST_POST_TEXT)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактированный текст'
+        post.save()
+        for address, args in (
+            ('posts:index', None),
+            ('posts:follow_index', None),
+            ('posts:search', None),
+        ):
+            with self.subTest(address=address):
+                response = self.auth_client.get(
+                    reverse(address, args=args), {'q': 'текст'}
+                )
+                self.assertNotContains(response, TEST_POST_TEXT)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertContains(
+            self.auth_client.get(reverse('posts:follow_index')),
+            'Отредактированный текст'
+        )
+
+    def test_post_card_author_rename(self):
+        """Новое имя автора попадает в закэшированные карточки."""
+        cache.clear()
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.auth_client.get(url)
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Новое'
+        author.last_name = 'Имя'
+        author.save()
+        self.assertContains(self.auth_client.get(url), 'Новое Имя')
+
+    def test_author_rename_scopes(self):
+        """Переименование сбрасывает только области, где есть имя."""
+        cache.clear()
+        other = User.objects.create_user(username='other_author')
+        other_post = Post.objects.create(
+            author=other, group=self.group2, text='Чужой пост'
+        )
+        Comment.objects.create(
+            post=other_post, author=self.user, text='Комментарий'
+        )
+        untouched = ('all', f'profile:{other.pk}', f'group:{self.group2.pk}')
+        touched = (
+            'index', f'profile:{self.user.pk}', f'group:{self.group.pk}',
+            f'card:{self.post.pk}', f'post:{other_post.pk}',
+        )
+        before = feed_cache.generations(*untouched, *touched)
+        author = User.objects.get(pk=self.user.pk)
+        author.save()
+        self.assertEqual(
+            feed_cache.generations(*untouched, *touched), before
+        )
+        author.username = 'renamed'
+        author.save()
+        after = feed_cache.generations(*untouched, *touched)
+        # Первым идёт поколение общей области all.
+        self.assertEqual(after[:4], before[:4])
+        for scope, old, new in zip(touched, before[4:], after[4:]):
+            with self.subTest(scope=scope):
+                self.assertNotEqual(old, new)
+
+    def test_cache_group_change(self):
+        """Перенос поста в другую группу обновляет обе ленты групп."""
+        cache.clear()
+        old_url = reverse('posts:group_list', args=(self.group.slug,))
+        self.assertEqual(
+            len(self.auth_client.get(old_url).context['page_obj']), ONE
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.group2
+        post.save()
+        response = self.auth_client.get(old_url)
+        self.assertNotContains(response, TEST_POST_TEXT)
+        response = self.auth_client.get(
+            reverse('posts:group_list', args=(self.group2.slug,))
+        )
+        self.assertContains(response, TEST_POST_TEXT)
+
     def test_follow(self):
         """Авторизованный пользователь может подписываться"""
         follow_count = Follow.objects.count()
@@ -272,3 +419,251 @@ class PaginatorViewTest(TestCase):
                         self.assertEqual(
                             len(response.context['page_obj']), units
                         )
+
+    def test_elided_page_range(self):
+        """Номера страниц ограничены окном вокруг текущей и краями"""
+        paginator = ElidedPaginator(range(500000), settings.POSTS_IN_PAGE)
+        ellipsis = paginator.ELLIPSIS
+        cases = (
+            (1, (1, 2, 3, 4, ellipsis, 49999, 50000)),
+            (5, (1, 2, 3, 4, 5, 6, 7, 8, ellipsis, 49999, 50000)),
+            (25000, (
+                1, 2, ellipsis, 24997, 24998, 24999, 25000, 25001, 25002,
+                25003, ellipsis, 49999, 50000,
+            )),
+            (50000, (1, 2, ellipsis, 49997, 49998, 49999, 50000)),
+        )
+        for number, expected in cases:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    tuple(paginator.get_elided_page_range(number)), expected
+                )
+        self.assertEqual(
+            tuple(ElidedPaginator(range(30), 10).get_elided_page_range(2)),
+            (1, 2, 3)
+        )
+
+    @override_settings(
+        POSTS_IN_PAGE=1, PAGINATOR_ON_EACH_SIDE=1, PAGINATOR_ON_ENDS=1
+    )
+    def test_paginator_template_window(self):
+        """Шаблон выводит только окно страниц, а не весь page_range"""
+        cache.clear()
+        response = self.auth_client.get(reverse('posts:index'), {'page': 7})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.elided_range, (1, '…', 6, 7, 8, '…', 13))
+        self.assertContains(response, 'page=13')
+        self.assertNotContains(response, 'page=5"')
+        self.assertNotContains(response, 'page=12"')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.auth_client.get(url, {'page': 1})
+        return response.context['page_obj'].paginator.count, [
+            query['sql'] for query in queries.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+
+    @override_settings(FEED_COUNT_STRATEGIES={'group': 'cached'})
+    def test_cached_count(self):
+        """Число постов группы кешируется до записи в группу"""
+        cache.clear()
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.assertEqual(self.count_queries(url)[0], settings.THIRTEEN)
+        self.assertEqual(self.count_queries(url), (settings.THIRTEEN, []))
+        Post.objects.create(author=self.user, group=self.group, text='Пост')
+        count, queries = self.count_queries(url)
+        self.assertEqual(count, settings.THIRTEEN + ONE)
+        self.assertTrue(queries)
+
+    @override_settings(
+        FEED_COUNT_STRATEGIES={'index': 'periodic'}, FEED_COUNT_EXACT_LIMIT=5
+    )
+    def test_periodic_count(self):
+        """Большая лента считается раз в период, маленькая — точно"""
+        cache.clear()
+        url = reverse('posts:index')
+        self.assertEqual(self.count_queries(url)[0], settings.THIRTEEN)
+        Post.objects.create(author=self.user, text='Пост')
+        self.assertEqual(self.count_queries(url)[0], settings.THIRTEEN)
+        with override_settings(FEED_COUNT_EXACT_LIMIT=100):
+            self.assertEqual(
+                self.count_queries(url)[0], settings.THIRTEEN + ONE
+            )
+
+    @override_settings(
+        FEED_COUNT_STRATEGIES={'index': 'estimate'}, FEED_COUNT_EXACT_LIMIT=5
+    )
+    def test_estimated_count(self):
+        """Оценка берётся из статистики планировщика"""
+        cache.clear()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        count, queries = self.count_queries(reverse('posts:index'))
+        self.assertEqual(count, settings.THIRTEEN)
+        self.assertFalse(any('posts_post"' in sql and 'LIMIT' not in sql
+                             for sql in queries))
+
+    def test_profile_count_from_counter(self):
+        """Профиль берёт число постов из денормализованного счётчика"""
+        cache.clear()
+        count, queries = self.count_queries(
+            reverse('posts:profile', args=(self.user.username,))
+        )
+        self.assertEqual(count, settings.THIRTEEN)
+        self.assertFalse(any('"posts_post"' in sql for sql in queries))
+
+    def test_cursor_paginator(self):
+        """Курсорный пагинатор проходит ленту без пропусков и COUNT(*)"""
+        posts = list(Post.objects.order_by('-pub_date', '-pk'))
+        seen = []
+        url = reverse('posts:index')
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.auth_client.get(url)
+            self.assertContains(response, '?cursor=')
+            page_obj = response.context['page_obj']
+            seen.extend(page_obj)
+            while page_obj.keyset.has_next():
+                response = self.auth_client.get(
+                    url, {'cursor': page_obj.keyset.next_cursor}
+                )
+                page_obj = response.context['page_obj']
+                seen.extend(page_obj)
+        self.assertEqual(seen, posts)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        )
+        response = self.auth_client.get(
+            url, {'cursor': page_obj.keyset.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            posts[:settings.POSTS_IN_PAGE]
+        )
+        self.assertFalse(response.context['page_obj'].keyset.has_previous())
+
+    def test_cursor_paginator_invalid_cursor(self):
+        """Некорректный курсор отдаёт первую страницу"""
+        response = self.auth_client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        )
+        self.assertEqual(
+            len(response.context['page_obj']), settings.POSTS_IN_PAGE
+        )
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.author.username,)),
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_not_modified(self):
+        """Неизменившаяся страница отвечает 304 по If-None-Match."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                cached = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(cached.status_code, 304)
+
+    def test_pages_differ_for_users(self):
+        """У страниц анонима и пользователя разные ETag."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                anonymous = self.client.get(url)
+                response = self.reader_client.get(url)
+                self.assertIn('private', response['Cache-Control'])
+                self.assertNotEqual(response['ETag'], anonymous['ETag'])
+
+    def test_changes_invalidate_etag(self):
+        """Комментарий и подписка меняют ETag страниц, где они видны."""
+        detail = reverse('posts:post_detail', args=(self.post.pk,))
+        profile = reverse('posts:profile', args=(self.author.username,))
+        changes = (
+            (detail, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            )),
+            (profile, lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            )),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.reader_client.get(url)['ETag']
+                change()
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Первый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_page_served_from_cache(self):
+        """Повторная анонимная страница отдаётся без запросов к базе."""
+        url = reverse('posts:index')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.content, first.content)
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Новый комментарий'
+        )
+        self.assertContains(self.client.get(url), 'Новый комментарий')
+
+    def test_authenticated_page_not_cached(self):
+        """Страницы вошедших пользователей собираются заново."""
+        client = Client()
+        client.force_login(self.author)
+        url = reverse('posts:index')
+        client.get(url)
+        response = client.get(url)
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, 'Пользователь: author')
+
+    def test_csrf_token_injected(self):
+        """CSRF-токен в кешированной странице — токен текущего запроса."""
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        page_cache.store(request, '"tag"', HttpResponse(
+            '<input name="csrfmiddlewaretoken" value="old">'
+        ))
+        response = page_cache.get(request, '"tag"')
+        self.assertNotIn(b'value="old"', response.content)
+        self.assertRegex(response.content, rb'value="\w{64}"')
+        self.assertTrue(request.META['CSRF_COOKIE_USED'])
@@ -0,0 +1,53 @@
+"""Миниатюры картинок постов.
+
+Все размеры из ``THUMBNAIL_ALIASES`` готовятся задачей очереди после
+сохранения поста, а их адреса и размеры записываются в ``Post.thumbnails``.
+Шаблоны берут готовые значения и не открывают картинку при отрисовке.
+"""
+import json
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import task
+
+from . import feed_cache
+from .models import Post
+
+
+@task
+def generate(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    source = post.image.name
+    sizes = {}
+    for alias, options in settings.THUMBNAIL_ALIASES.items():
+        options = dict(options)
+        geometry = options.pop('geometry')
+        thumbnail = get_thumbnail(post.image, geometry, **options)
+        sizes[alias] = {
+            'url': thumbnail.url,
+            'width': thumbnail.width,
+            'height': thumbnail.height,
+        }
+    # Картинку могли заменить, пока готовились миниатюры старой.
+    updated = Post.objects.filter(pk=post_id, image=source).update(
+        thumbnails=json.dumps({'source': source, 'sizes': sizes})
+    )
+    if updated:
+        feed_cache.bump(*feed_cache.post_scopes(post))
+
+
+def _image_exists(post):
+    try:
+        return post.image.storage.exists(post.image.name)
+    except SuspiciousFileOperation:
+        return False
+
+
+def schedule(post):
+    """Ставит подготовку миниатюр поста в очередь."""
+    if _image_exists(post):
+        generate.delay(post.pk)
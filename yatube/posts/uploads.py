@@ -0,0 +1,197 @@
+"""Приём картинок постов.
+
+Загрузка сразу пишется во временный файл (``LimitedUploadHandler``), а не
+в память. По первому куску проверяется сигнатура формата, а байты сверх
+``UPLOAD_MAX_SIZE`` отбрасываются, так что ни мусор, ни слишком большой
+файл не займут диск целиком.
+
+Принятая картинка пережимается (``reencode``): уменьшается до
+``IMAGE_MAX_DIMENSION`` по большей стороне, сохраняется заново без EXIF и
+прочих метаданных, а по получившимся байтам считается SHA-256. Под этим
+хешем файл и сохраняется (``core.storage``), так что посты с одинаковой
+картинкой ссылаются на один файл.
+
+Анимация ограничена ``IMAGE_UPLOAD_MAX_FRAMES`` кадрами, а
+``IMAGE_UPLOAD_MAX_PIXELS`` — это бюджет на все кадры вместе. Кадры GIF
+считаются по блокам файла: Pillow для ``n_frames`` декодирует каждый кадр,
+и маленький файл с сотнями огромных кадров занял бы обработчик надолго.
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps, ImageSequence
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+SIGNATURES = (
+    b'\xff\xd8\xff',
+    b'\x89PNG\r\n\x1a\n',
+    b'GIF87a',
+    b'GIF89a',
+)
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+# Из метаданных кадра при пересохранении остаётся только нужное для
+# отрисовки.
+KEEP_INFO = ('transparency', 'duration', 'loop', 'background', 'icc_profile')
+
+
+def _known_signature(head):
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return True
+    return head.startswith(SIGNATURES)
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку на диск, отбрасывая явно негодные байты.
+
+    Если первый кусок не похож на картинку или файл перерос
+    ``UPLOAD_MAX_SIZE``, остаток не записывается. У файла остаётся
+    настоящий ``size``, а у обрезанного по размеру — флаг ``truncated``.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file.truncated = False
+        self.rejected = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.rejected or self.file.truncated:
+            return None
+        if start + len(raw_data) > settings.UPLOAD_MAX_SIZE:
+            self.file.truncated = True
+            return None
+        if start == 0 and not _known_signature(raw_data[:12]):
+            # Первого куска хватит, чтобы форма отклонила файл.
+            self.rejected = True
+        self.file.write(raw_data)
+        return None
+
+
+def too_large_error():
+    return ValidationError(
+        'Файл слишком большой, максимум %(limit)s.',
+        code='too_large',
+        params={'limit': filesizeformat(settings.UPLOAD_MAX_SIZE)},
+    )
+
+
+def _skip_sub_blocks(file):
+    while True:
+        size = file.read(1)
+        if not size or size == b'\x00':
+            return
+        file.seek(size[0], os.SEEK_CUR)
+
+
+def _skip_color_table(file, flags):
+    if flags & 0x80:
+        file.seek(3 << ((flags & 0x07) + 1), os.SEEK_CUR)
+
+
+def _gif_frames(file, limit):
+    """Число кадров GIF (не больше limit + 1) без декодирования."""
+    file.seek(6)
+    screen = file.read(7)
+    if len(screen) < 7:
+        return 1
+    _skip_color_table(file, screen[4])
+    frames = 0
+    while frames <= limit:
+        block = file.read(1)
+        if block == b'\x2c':
+            frames += 1
+            descriptor = file.read(9)
+            if len(descriptor) < 9:
+                break
+            _skip_color_table(file, descriptor[8])
+            file.read(1)
+        elif block != b'\x21':
+            break
+        else:
+            file.read(1)
+        _skip_sub_blocks(file)
+    return max(frames, 1)
+
+
+def _gif_frames_or_none(upload):
+    upload.seek(0)
+    frames = None
+    if upload.read(6) in (b'GIF87a', b'GIF89a'):
+        frames = _gif_frames(upload, settings.IMAGE_UPLOAD_MAX_FRAMES)
+    upload.seek(0)
+    return frames
+
+
+def _validate(image, frames):
+    if image.format not in settings.IMAGE_UPLOAD_FORMATS:
+        raise ValidationError(
+            'Формат %(format)s не поддерживается.',
+            code='format',
+            params={'format': image.format},
+        )
+    if frames > settings.IMAGE_UPLOAD_MAX_FRAMES:
+        raise ValidationError(
+            'Слишком много кадров, максимум %(limit)s.',
+            code='frames',
+            params={'limit': settings.IMAGE_UPLOAD_MAX_FRAMES},
+        )
+    width, height = image.size
+    if frames * width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise ValidationError(
+            'Анимация слишком большая: %(frames)s кадров %(width)s×%(height)s.'
+            if frames > 1 else
+            'Картинка слишком большая: %(width)s×%(height)s.',
+            code='pixels',
+            params={'width': width, 'height': height, 'frames': frames},
+        )
+
+
+def _prepare(frame, keep_exif_orientation=False):
+    if keep_exif_orientation:
+        frame = ImageOps.exif_transpose(frame)
+    else:
+        frame = frame.copy()
+    limit = settings.IMAGE_MAX_DIMENSION
+    frame.thumbnail((limit, limit), Image.LANCZOS)
+    frame.info = {
+        key: value for key, value in frame.info.items() if key in KEEP_INFO
+    }
+    return frame
+
+
+def reencode(upload):
+    """Пережатая картинка загрузки: ``ContentFile`` с атрибутом ``digest``.
+
+    Размеры, число кадров и формат проверяются до декодирования пикселей.
+    Кадры анимации декодируются по одному, по мере записи.
+    """
+    gif_frames = _gif_frames_or_none(upload)
+    buffer = BytesIO()
+    with Image.open(upload) as image:
+        # У PNG и WebP число кадров записано в заголовке.
+        _validate(image, gif_frames or getattr(image, 'n_frames', 1))
+        fmt = image.format
+        options = dict(settings.IMAGE_SAVE_OPTIONS.get(fmt, {}))
+        if getattr(image, 'is_animated', False):
+            frames = ImageSequence.Iterator(image)
+            first = _prepare(next(frames))
+            options.update(save_all=True, append_images=(
+                _prepare(frame) for frame in frames
+            ))
+        else:
+            first = _prepare(image, keep_exif_orientation=True)
+        if fmt == 'JPEG' and first.mode not in ('RGB', 'L'):
+            first = first.convert('RGB')
+        first.save(buffer, fmt, **options)
+    content = buffer.getvalue()
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    result = ContentFile(content, name=f'{stem}.{EXTENSIONS[fmt]}')
+    result.digest = hashlib.sha256(content).hexdigest()
+    return result
@@ -1,8 +1,241 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def keyset_after(ordering, values):
+    """Условие «строго после values» в порядке ordering.
+
+    Первый ключ задаётся диапазоном (``<=``/``>=``), чтобы база могла
+    читать индекс по порядку, остальные отсекают совпадения с границей.
+    """
+    name, *rest = ordering
+    field = name.lstrip('-')
+    lookup = 'lt' if name.startswith('-') else 'gt'
+    if not rest:
+        return Q(**{f'{field}__{lookup}': values[0]})
+    return Q(**{f'{field}__{lookup}e': values[0]}) & ~(
+        Q(**{field: values[0]}) & ~keyset_after(rest, values[1:])
+    )
+
+
+def keyset_slice(queryset, ordering, values, limit):
+    """Первые limit объектов queryset после values в порядке ordering."""
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(keyset_after(ordering, values))
+    return list(queryset[:limit])
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинатор: страницы выбираются по условию на ключ сортировки
+    (по умолчанию ``(pub_date, id)``) вместо OFFSET и без COUNT(*).
+
+    Кроме QuerySet принимает источники с методом ``keyset_slice`` и
+    атрибутом ``model`` — так устроена, например, лента подписок.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-pk')):
+        if not hasattr(object_list, 'keyset_slice'):
+            object_list = object_list.order_by(*ordering)
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+
+    def _fields(self):
+        model = self.object_list.model
+        return [
+            model._meta.pk if name.lstrip('-') == 'pk'
+            else model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj, direction):
+        values = [
+            field.value_to_string(obj) for field in self._fields()
+        ]
+        data = json.dumps([direction] + values, separators=(',', ':'))
+        return urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, *values = json.loads(urlsafe_b64decode(padded))
+            fields = self._fields()
+            if direction not in (NEXT, PREVIOUS) or (
+                len(values) != len(fields)
+            ):
+                raise ValueError
+            return direction, [
+                field.to_python(value)
+                for field, value in zip(fields, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidCursor('Некорректный курсор страницы')
+
+    def fetch(self, direction, values):
+        ordering = self.ordering
+        if direction == PREVIOUS:
+            ordering = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            ]
+        limit = self.per_page + 1
+        if hasattr(self.object_list, 'keyset_slice'):
+            return self.object_list.keyset_slice(ordering, values, limit)
+        return keyset_slice(self.object_list, ordering, values, limit)
+
+    def page(self, cursor=None):
+        if not cursor:
+            window = CursorWindow(self)
+        else:
+            direction, values = self.decode_cursor(cursor)
+            window = CursorWindow(self, direction, values)
+        page = Page(window, None, self)
+        page.cursor = cursor
+        page.keyset = window
+        return page
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+class CursorWindow:
+    """Ленивый список объектов курсорной страницы и навигация по ней.
+
+    Запрос к базе выполняется при первом обращении к объектам, поэтому
+    страница, чей HTML уже лежит в кеше, обходится без запросов.
+    """
+    is_cursor = True
+
+    def __init__(self, paginator, direction=NEXT, values=None):
+        self.paginator = paginator
+        self.direction = direction
+        self.values = values
+
+    @cached_property
+    def _window(self):
+        rows = self.paginator.fetch(self.direction, self.values)
+        more = len(rows) > self.paginator.per_page
+        rows = rows[:self.paginator.per_page]
+        if self.direction == PREVIOUS:
+            rows.reverse()
+        return rows, more
+
+    def __len__(self):
+        return len(self._window[0])
+
+    def __iter__(self):
+        return iter(self._window[0])
+
+    def __getitem__(self, index):
+        return self._window[0][index]
+
+    def has_next(self):
+        if self.direction == PREVIOUS:
+            return bool(self._window[0])
+        return self._window[1]
+
+    def has_previous(self):
+        if self.direction == PREVIOUS:
+            return self._window[1]
+        return self.values is not None and bool(self._window[0])
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.encode_cursor(self[-1], NEXT)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.encode_cursor(self[0], PREVIOUS)
+        return None
+
+
+class ElidedPaginator(Paginator):
+    """Paginator с укороченным списком номеров страниц.
+
+    ``get_elided_page_range`` отдаёт первые и последние ``on_ends`` страниц
+    и по ``on_each_side`` вокруг текущей, пропуски заменяет на
+    ``ELLIPSIS`` — ссылок всегда не больше ``2 * (on_ends + on_each_side)
+    + 3`` при любом числе страниц.
+    """
+    ELLIPSIS = '…'
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        number = self.validate_number(number)
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > on_each_side + on_ends + 2:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+
+def paginator_obj(request, list, numbered=False, count=None):
+    """Страница ленты: по курсору, а нумерованная — только по явному
+    запросу (``numbered=True`` или параметр ``?page=``).
+
+    ``count`` — функция, которая вернёт число объектов вместо точного
+    ``COUNT(*)`` (см. ``feed_cache.page_count``).
+    """
+    if numbered or 'page' in request.GET:
+        paginator = ElidedPaginator(list, settings.POSTS_IN_PAGE)
+        if count is not None:
+            paginator.count = count()
+        page = paginator.get_page(request.GET.get('page'))
+        page.elided_range = tuple(paginator.get_elided_page_range(
+            page.number,
+            on_each_side=settings.PAGINATOR_ON_EACH_SIDE,
+            on_ends=settings.PAGINATOR_ON_ENDS,
+        ))
+        return page
+    paginator = CursorPaginator(list, settings.POSTS_IN_PAGE)
+    return paginator.get_page(request.GET.get('cursor'))
+
 
+def comments_obj(request, post):
+    """Страница комментариев поста в порядке публикации.
 
-def paginator_obj(request, list):
-    paginator = Paginator(list, settings.POSTS_IN_PAGE)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    Первая страница короче (``COMMENTS_FIRST_PAGE``), следующие
+    подгружаются по курсору порциями ``COMMENTS_PER_PAGE``.
+    """
+    cursor = request.GET.get('cursor')
+    per_page = settings.COMMENTS_PER_PAGE
+    if not cursor:
+        per_page = settings.COMMENTS_FIRST_PAGE
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        per_page,
+        ordering=('created', 'pk')
+    )
+    return paginator.get_page(cursor)
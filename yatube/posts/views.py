@@ -1,54 +1,131 @@
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
+from core.db import replica_reads
+
+from . import counters, feed_cache, search
+from .conditional import conditional_page, page_etag
+from .feeds import FollowFeed, follow_feed
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .utils import paginator_obj
+from .utils import comments_obj, paginator_obj
+
+
+def _group_etag(request, slug):
+    # Группа нужна и представлению: выбираем её один раз на запрос.
+    request.feed_group = Group.objects.filter(slug=slug).first()
+    if request.feed_group is not None:
+        return page_etag(request, f'group:{request.feed_group.pk}')
+    return None
+
+
+def _profile_etag(request, username):
+    # В stats:<id> учтены и счётчики профиля, и подписка посетителя:
+    # подписка меняет счётчики обоих пользователей.
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is not None:
+        return page_etag(
+            request, f'profile:{author_id}', f'stats:{author_id}'
+        )
+    return None
+
+
+def _post_etag(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is not None:
+        return page_etag(
+            request, f'post:{post_id}', f'card:{post_id}',
+            f'stats:{author_id}'
+        )
+    return None
 
 
+@replica_reads
+@conditional_page(lambda request: page_etag(request, 'index'))
 def index(request):
     posts_list = Post.objects.all().select_related('author', 'group')
-    page_obj = paginator_obj(request, posts_list)
+    page_obj = paginator_obj(
+        request, posts_list,
+        count=lambda: feed_cache.page_count('index', posts_list, 'index')
+    )
     context = {
         'page_obj': page_obj,
+        **feed_cache.context(request, 'index'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@conditional_page(_group_etag)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = getattr(request, 'feed_group', None) or get_object_or_404(
+        Group, slug=slug
+    )
     posts_list = group.posts.all().select_related('author')
-    page_obj = paginator_obj(request, posts_list)
+    page_obj = paginator_obj(
+        request, posts_list,
+        count=lambda: feed_cache.page_count(
+            'group', posts_list, f'group:{group.pk}'
+        )
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        **feed_cache.context(request, f'group:{group.pk}'),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    results = search.get_backend().search(query)
+    context = {
+        'query': query,
+        'page_obj': paginator_obj(request, results, numbered=True),
+        'query_prefix': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@replica_reads
+@conditional_page(_profile_etag)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
     posts = author.posts.all().select_related('group')
-    count_posts = posts.count()
-    page_obj = paginator_obj(request, posts)
+    stats = counters.get(author)
+    page_obj = paginator_obj(
+        request, posts,
+        count=lambda: feed_cache.page_count(
+            'profile', posts, f'profile:{author.pk}', known=stats.posts_count
+        )
+    )
     following = (
         request.user.is_authenticated and Follow.objects.filter(
             user=request.user, author=author).exists()
     )
 
     context = {
-        'count': count_posts,
+        'count': stats.posts_count,
+        'stats': stats,
         'page_obj': page_obj,
         'author': author,
         'following': following,
+        **feed_cache.context(request, f'profile:{author.pk}'),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@conditional_page(_post_etag)
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.select_related('author').prefetch_related(
-            'comments__author'), id=post_id
+        Post.objects.select_related('author', 'group'), id=post_id
     )
     form = CommentForm(
         request.POST or None,
@@ -56,12 +133,25 @@ def post_detail(request, post_id):
     )
     context = {
         'post': post,
+        'author_stats': counters.get(post.author),
         'form': form,
-        'comments': post.comments.all()
+        'comments': comments_obj(request, post),
+        **feed_cache.context(request, f'post:{post.pk}'),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': comments_obj(request, post),
+        **feed_cache.context(request, f'post:{post.pk}'),
+    }
+    return render(request, 'posts/includes/comments_page.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -71,7 +161,8 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        with transaction.atomic():
+            post.save()
         return redirect('posts:profile', post.author.username)
     context = {
         'form': form,
@@ -110,12 +201,16 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('author')
-    page_obj = paginator_obj(request, posts)
+    page_obj = paginator_obj(
+        request, follow_feed(request.user),
+        count=lambda: feed_cache.page_count(
+            'follow', FollowFeed(request.user).queryset(),
+            f'follow:{request.user.pk}'
+        )
+    )
     context = {
         'page_obj': page_obj
     }
@@ -127,10 +222,11 @@ def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(
-            user=user,
-            author=author
-        )
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                user=user,
+                author=author
+            )
     return redirect('posts:profile', username)
 
 
@@ -28,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
+    'core.db.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -40,12 +42,25 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# В режиме кеша каждый шаблон (и все {% include %}) разбирается один раз
+# на процесс; wsgi.py прогревает кеш при старте. С DEBUG по умолчанию
+# выключен, чтобы правки шаблонов подхватывались без перезапуска.
+TEMPLATES_CACHED = os.environ.get(
+    'YATUBE_TEMPLATES_CACHED', '0' if DEBUG else '1'
+) == '1'
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATES_CACHED else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -66,6 +81,61 @@ DATABASES = {
     }
 }
 
+# Режим для продакшена на SQLite (core.backends.sqlite3): WAL, чтобы
+# читатели не ждали писателя, mmap, ожидание блокировки вместо
+# «database is locked», транзакции сразу на запись и соединения, живущие
+# CONN_MAX_AGE секунд. Включается YATUBE_SQLITE_TUNED=1; сравнить режимы —
+# manage.py benchmark_sqlite.
+SQLITE_TUNED = os.environ.get('YATUBE_SQLITE_TUNED', '0') == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+    'cache_size': -20000,
+}
+SQLITE_CONN_MAX_AGE = 60
+if SQLITE_TUNED:
+    DATABASES['default'].update(
+        ENGINE='core.backends.sqlite3',
+        CONN_MAX_AGE=SQLITE_CONN_MAX_AGE,
+        OPTIONS={
+            'pragmas': SQLITE_PRAGMAS,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    )
+
+# Реплики для чтения лент (core.db): YATUBE_DB_REPLICAS — пути к копиям
+# базы SQLite через запятую. Реплики открываются только на чтение, в тестах
+# подменяются основной базой. Посетитель, который что-то записал, ещё
+# REPLICA_STICKY_SECONDS читает с основной базы.
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.environ.get(
+    'YATUBE_DB_REPLICAS', ''
+).split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{path}?mode=ro',
+        'OPTIONS': {'uri': True},
+        'TEST': {'MIRROR': 'default'},
+    }
+    if SQLITE_TUNED:
+        # Режим журнала задаёт основная база, реплика его только читает.
+        DATABASES[f'replica{number}'].update(
+            ENGINE='core.backends.sqlite3',
+            CONN_MAX_AGE=SQLITE_CONN_MAX_AGE,
+        )
+        DATABASES[f'replica{number}']['OPTIONS']['pragmas'] = {
+            name: value for name, value in SQLITE_PRAGMAS.items()
+            if name != 'journal_mode'
+        }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+REPLICA_APPS = ('posts',)
+REPLICA_STICKY_SECONDS = 10
+REPLICA_STICKY_COOKIE = 'primary'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -95,8 +165,63 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+# collectstatic кладёт в STATIC_ROOT файлы с хешем в имени и их сжатые
+# копии .gz/.br (core.staticfiles). Пакет brotli необязателен: без него
+# пишутся только .gz. При SERVE_FILES статику и медиафайлы
+# с ETag, 304, Range и долгим кешированием отдаёт само приложение
+# (core.serving); за nginx это можно выключить.
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_collected')
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+STATIC_COMPRESS_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.html', '.txt', '.json', '.xml', '.ico',
+)
+STATIC_COMPRESS_MIN_SIZE = 256
+SERVE_FILES = os.environ.get('YATUBE_SERVE_FILES', '1') == '1'
+FILES_MAX_AGE = 60 * 60 * 24 * 365
+
 POSTS_IN_PAGE = 10
+# Входит в ETag страниц и ответов API: новый выпуск с другими шаблонами
+# не должен получать 304 на старые версии.
+PAGES_VERSION = os.environ.get('YATUBE_RELEASE', '')
+# Наибольший размер страницы JSON API (?limit=).
+API_MAX_PAGE_SIZE = 100
+# Нумерованный пагинатор показывает первые и последние PAGINATOR_ON_ENDS
+# страниц и по PAGINATOR_ON_EACH_SIDE вокруг текущей.
+PAGINATOR_ON_EACH_SIDE = 3
+PAGINATOR_ON_ENDS = 1
 THIRTEEN = 13
+COMMENTS_FIRST_PAGE = 20
+COMMENTS_PER_PAGE = 50
+
+# Материализованная лента подписок: посты авторов, у которых подписчиков
+# не меньше FOLLOW_FEED_FANOUT_LIMIT, подмешиваются в ленту при чтении.
+# Ленты раскладываются задачами очереди, поэтому YATUBE_FOLLOW_FEED=1
+# включается вместе с обработчиком run_tasks и после rebuild_follow_feed;
+# без него лента строится запросом по подпискам.
+FOLLOW_FEED_MATERIALIZED = os.environ.get('YATUBE_FOLLOW_FEED', '0') == '1'
+FOLLOW_FEED_FANOUT_LIMIT = 1000
+FOLLOW_FEED_BATCH_SIZE = 1000
+
+# Учёт SQL-запросов на каждый HTTP-запрос: превышение бюджета
+# представления и повторы одного SQL (N+1) пишутся в лог core.queries.
+QUERY_BUDGET_ENABLED = True
+QUERY_BUDGET_SAMPLE_RATE = 1.0
+QUERY_BUDGET_HEADER = DEBUG
+QUERY_BUDGET_DEFAULT = 15
+QUERY_BUDGETS = {
+    # Нумерованная страница длинной ленты раз в FEED_COUNT_TIMEOUT платит
+    # за ограниченный COUNT и полный подсчёт (или оценку по статистике —
+    # два запроса в SQLite); остальное время число берётся из кеша.
+    'posts:index': 6,
+    'posts:group_list': 5,
+    'posts:profile': 7,
+    'posts:post_detail': 6,
+    'posts:follow_index': 6,
+    'posts:search': 5,
+    # Подписка пересчитывает счётчики и донаполняет ленту.
+    'posts:profile_follow': 25,
+}
+QUERY_REPEAT_THRESHOLD = 3
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -106,9 +231,95 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Файлы называются по хешу содержимого, одинаковые хранятся один раз
+# (core.storage). Миниатюры sorl именуются по своим ключам и хранятся
+# обычным образом.
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+# Файл без ссылок удаляется, только если его не записывали и не
+# переиспользовали MEDIA_RELEASE_GRACE секунд: иначе он мог только что
+# достаться посту из ещё не зафиксированной транзакции. Такие файлы
+# подбирает media_usage --delete-orphans.
+MEDIA_RELEASE_GRACE = 60 * 15
 
-CACHES = {
-    'default': {
+# Загрузки пишутся сразу на диск; байты сверх UPLOAD_MAX_SIZE отбрасываются,
+# и форма отклоняет файл. Картинки постов пережимаются до IMAGE_MAX_DIMENSION
+# по большей стороне без метаданных (posts.uploads).
+FILE_UPLOAD_HANDLERS = ['posts.uploads.LimitedUploadHandler']
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# Бюджет пикселей — на все кадры анимации вместе.
+IMAGE_UPLOAD_MAX_PIXELS = 40 * 1000 * 1000
+IMAGE_UPLOAD_MAX_FRAMES = 100
+IMAGE_MAX_DIMENSION = 1920
+IMAGE_SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 85},
+}
+
+# Поиск по постам: SQLiteFTSBackend для SQLite, DatabaseSearchBackend
+# (icontains) для остальных баз.
+POSTS_SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+
+# Готовые страницы лент для анонимов (posts.page_cache); ключ меняется
+# вместе с поколениями feed_cache, таймаут лишь ограничивает хранение.
+PAGE_CACHE_ENABLED = os.environ.get('YATUBE_PAGE_CACHE', '1') == '1'
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Миниатюры картинок постов готовятся задачей очереди после сохранения.
+THUMBNAIL_ALIASES = {
+    'card': {'geometry': '1295x300', 'crop': 'center'},
+    'detail': {'geometry': '960x339', 'crop': 'center', 'upscale': True},
+}
+
+# Очередь отложенных задач (core.tasks), обработчик — manage.py run_tasks.
+# YATUBE_TASKS_EAGER=1 выполняет задачи сразу в запросе — только для
+# отладки без обработчика: запись тогда платит за миниатюры и раскладку.
+TASKS_EAGER = os.environ.get('YATUBE_TASKS_EAGER', '0') == '1'
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_DELAY = 10
+TASKS_LOCK_TIMEOUT = 60 * 10
+TASKS_WORKER_THREADS = 4
+
+# Кеш: locmem (свой в каждом процессе), sqlite (файл, общий для всех
+# процессов на машине) или redis (Redis или manage.py cache_server).
+CACHE_BACKEND = os.environ.get('YATUBE_CACHE', 'locmem')
+CACHE_PRESETS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'CULL_FREQUENCY': 10,
+            'EVICTION': 'lru',
+        },
+    },
+    'redis': {
+        'BACKEND': 'core.cache.redis.RedisCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_REDIS_URL', 'redis://127.0.0.1:6379/0'
+        ),
+    },
+}
+CACHES = {
+    'default': CACHE_PRESETS[CACHE_BACKEND],
+}
+
+# Фрагменты лент инвалидируются сигналами, срок жизни лишь ограничивает
+# хранение вытесненных поколений.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Как нумерованный пагинатор узнаёт число постов ленты: exact, cached,
+# periodic, estimate или counter (см. posts.feed_cache.page_count).
+FEED_COUNT_STRATEGIES = {
+    'index': 'periodic',
+    'group': 'cached',
+    'profile': 'counter',
+    'follow': 'periodic',
 }
+FEED_COUNT_EXACT_LIMIT = 1000
+FEED_COUNT_TIMEOUT = 60 * 5
@@ -1,10 +1,14 @@
+import re
+
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core import serving
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/', include('posts.api_urls', namespace='api')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('', include('posts.urls')),
@@ -13,7 +17,13 @@ urlpatterns = [
 ]
 handler403 = 'core.views.permission_denied'
 handler404 = 'core.views.page_not_found'
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
+if settings.SERVE_FILES:
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>.+)$' % re.escape(prefix.lstrip('/')), view
+        )
+        for prefix, view in (
+            (settings.MEDIA_URL, serving.media),
+            (settings.STATIC_URL, serving.static),
+        )
+    ]